@@ -0,0 +1,137 @@
+import numpy as np
+
+from GameState import ALIVE, ELIGIBLE, INVESTIGATED, Phase
+
+
+class ActionSpace:
+    """
+    Fixed numbering of every action any player can take in a game with num_players
+    players, using the same action tuples as Player.possible_actions:
+
+      ('Nominate', player_id)          n
+      ('Vote', 'Yes'), ('Vote', 'No')  2
+      ('Discard', policy)              2   Liberal, Fascist
+      ('Enact', policy)                2   Liberal, Fascist
+      ('Veto',)                        1
+      ('Investigate', player_id)       n
+      ('Kill', player_id)              n
+      ('SpecialElection', player_id)   n
+
+    for 4n + 7 actions in total.
+    """
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        players = range(num_players)
+        self.actions = (
+            [('Nominate', player_id) for player_id in players]
+            + [('Vote', 'Yes'), ('Vote', 'No')]
+            + [('Discard', 'Liberal'), ('Discard', 'Fascist')]
+            + [('Enact', 'Liberal'), ('Enact', 'Fascist')]
+            + [('Veto',)]
+            + [('Investigate', player_id) for player_id in players]
+            + [('Kill', player_id) for player_id in players]
+            + [('SpecialElection', player_id) for player_id in players]
+        )
+        self.indices = {action: index for index, action in enumerate(self.actions)}
+
+        # Start of each block of actions
+        n = num_players
+        self.nominate = 0
+        self.vote = n
+        self.discard = n + 2
+        self.enact = n + 4
+        self.veto = n + 6
+        self.investigate = n + 7
+        self.kill = 2 * n + 7
+        self.special_election = 3 * n + 7
+
+    def __len__(self):
+        return len(self.actions)
+
+    def action_index(self, action):
+        return self.indices[action]
+
+    def new_mask(self, batch_size=None):
+        shape = (len(self),) if batch_size is None else (batch_size, len(self))
+        return np.zeros(shape, dtype=np.bool_)
+
+    def legal_action_mask(self, game_state, player_id, out=None):
+        """
+        Boolean vector over this action space, True for the actions player_id may
+        take in game_state's current phase. Player-targeted blocks are filled
+        straight from GameState's alive, eligibility and investigation arrays.
+        """
+        if out is None:
+            out = self.new_mask()
+        else:
+            out[:] = False
+        n = self.num_players
+        phase = game_state.phase
+        president = game_state.presidential_candidate
+        data = np.frombuffer(game_state.player_data, np.uint8)
+        alive = data[ALIVE * n:(ALIVE + 1) * n]
+
+        if phase == Phase.VOTE:
+            if alive[player_id]:
+                out[self.vote:self.vote + 2] = True
+        elif phase == Phase.ENACT:
+            if player_id == game_state.nominated_chancellor:
+                out[self.enact] = game_state.hand_liberal > 0
+                out[self.enact + 1] = game_state.hand_fascist > 0
+                out[self.veto] = game_state.veto_power_active
+        elif player_id != president:
+            # Every other phase is a decision for the President alone
+            pass
+        elif phase == Phase.NOMINATION:
+            block = out[self.nominate:self.nominate + n]
+            np.logical_and(alive, data[ELIGIBLE * n:(ELIGIBLE + 1) * n], out=block)
+            block[president] = False
+            if not block.any():
+                # Nobody is eligible, so the term limits are lifted
+                block[:] = alive
+                block[president] = False
+        elif phase == Phase.DISCARD:
+            out[self.discard] = game_state.hand_liberal > 0
+            out[self.discard + 1] = game_state.hand_fascist > 0
+        elif phase == Phase.INVESTIGATE:
+            block = out[self.investigate:self.investigate + n]
+            np.logical_and(alive, data[INVESTIGATED * n:(INVESTIGATED + 1) * n] == 0, out=block)
+            block[president] = False
+        elif phase == Phase.KILL or phase == Phase.SPECIAL_ELECTION:
+            start = self.kill if phase == Phase.KILL else self.special_election
+            block = out[start:start + n]
+            block[:] = alive
+            block[president] = False
+        return out
+
+    def legal_actions(self, game_state, player_id):
+        """
+        The legal actions as a list of action tuples.
+        """
+        mask = self.legal_action_mask(game_state, player_id)
+        return [self.actions[index] for index in np.flatnonzero(mask)]
+
+
+_action_spaces = {}
+
+
+def action_space_for(num_players):
+    """
+    Shared ActionSpace for a player count.
+    """
+    action_space = _action_spaces.get(num_players)
+    if action_space is None:
+        action_space = _action_spaces[num_players] = ActionSpace(num_players)
+    return action_space
+
+
+def num_players_for(num_actions):
+    """
+    Player count of the ActionSpace with num_actions actions.
+    """
+    return (num_actions - 7) // 4
+
+
+def legal_action_mask(game_state, player_id, out=None):
+    return action_space_for(game_state.num_players).legal_action_mask(game_state, player_id, out)
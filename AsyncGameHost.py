@@ -0,0 +1,219 @@
+import asyncio
+import random
+
+from ActionSpace import action_space_for
+from EventLog import SILENT_LOG
+from GameState import Phase
+from SecretHitlerGame import SecretHitlerGame
+
+
+class LocalAgent:
+    """
+    Stub agent that plays uniformly at random among the legal actions after an
+    optional delay, to exercise AsyncGameHost offline. Remote agents (UIs, model
+    servers) implement the same coroutine:
+
+        async def decide(self, game_state, player_id, legal_actions) -> action tuple
+
+    game_state is the deciding player's view (SecretHitlerGame.player_view) and
+    legal_actions the ActionSpace tuples it may answer with.
+    """
+
+    def __init__(self, delay=0.0, seed=None):
+        self.delay = delay
+        self.rng = random.Random(seed)
+
+    async def decide(self, game_state, player_id, legal_actions):
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        return self.rng.choice(legal_actions)
+
+
+class AsyncSecretHitlerGame(SecretHitlerGame):
+    """
+    A SecretHitlerGame whose phases are coroutines, so every decision of a player
+    with an agent is awaited instead of called. start_game() must be awaited.
+
+    agents maps player ids to agents; players without one decide synchronously
+    as usual. An agent that doesn't answer within decision_timeout seconds,
+    raises, or answers with an illegal action, is replaced for that decision by
+    the player's own random policy.
+    """
+
+    def __init__(self, num_players=7, seed=None, agents=None, decision_timeout=1.0, **options):
+        super().__init__(num_players, seed, **options)
+        self.agents = agents if agents is not None else {}
+        self.decision_timeout = decision_timeout
+        self.agent_decisions = 0
+        self.timeouts = 0
+        self.agent_errors = 0
+        self.illegal_actions = 0
+
+    async def decide(self, player):
+        """
+        Ask player's agent for an action in the current phase. Returns None when
+        the player has no agent or the agent failed, and the caller falls back
+        to the player's synchronous decision method.
+        """
+        agent = self.agents.get(player.player_id)
+        if agent is None:
+            return None
+        legal_actions = action_space_for(self.num_players).legal_actions(self.state, player.player_id)
+        # Cheaper than asyncio.wait_for, which wraps the agent in a second task
+        task = asyncio.ensure_future(agent.decide(self.player_view(player), player.player_id, legal_actions))
+        timed_out = []
+
+        def time_out():
+            if task.cancel():
+                timed_out.append(True)
+
+        timer = asyncio.get_running_loop().call_later(self.decision_timeout, time_out)
+        try:
+            action = await task
+        except asyncio.CancelledError:
+            # Cancelling this game cancels the agent's task too, so only the timer's flag tells them apart
+            if not timed_out:
+                raise
+            self.timeouts += 1
+            return None
+        except Exception:
+            self.agent_errors += 1
+            return None
+        finally:
+            timer.cancel()
+        if action not in legal_actions:
+            self.illegal_actions += 1
+            return None
+        self.agent_decisions += 1
+        return action
+
+    async def start_game(self):
+        while not self.game_ended:
+            await self.conduct_election()
+            if self.president and self.chancellor and not self.game_ended:
+                enacted_policy = await self.execute_legislative_session()
+                if self.game_ended:
+                    break  # The enacted policy won the game, so no presidential power follows
+                if enacted_policy:
+                    await self.execute_executive_action(enacted_policy)
+        return self.end_game()
+
+    async def conduct_election(self):
+        self.start_election()
+
+        action = await self.decide(self.president)
+        if action is not None:
+            chancellor = self.players[action[1]]
+        else:
+            chancellor = self.president.nominate_chancellor(self.chancellor_candidates())
+        self.nominate(chancellor)
+
+        # Every voter with an agent is asked at once
+        voters = self.voters()
+        if any(player.player_id in self.agents for player in voters):
+            actions = await asyncio.gather(*[self.decide(player) for player in voters])
+        else:
+            actions = [None] * len(voters)
+        votes = [action[1] if action is not None else player.vote(self.president, self.chancellor)
+                 for player, action in zip(voters, actions)]
+        self.count_votes(voters, votes)
+
+    async def execute_legislative_session(self):
+        drawn_policies = self.draw_legislative_hand()
+
+        action = await self.decide(self.president)
+        if action is not None:
+            discarded_policy = action[1]
+            drawn_policies.remove(discarded_policy)
+        else:
+            discarded_policy = self.president.discard_policy(drawn_policies)
+        remaining_policies = self.discard_from_hand(discarded_policy, drawn_policies)
+
+        action = await self.decide(self.chancellor)
+        if action is not None and action[0] == 'Enact':
+            enacted_policy = action[1]
+        else:
+            # The game has no veto step yet, so a veto enacts at random like Player.enact_policy
+            enacted_policy = self.chancellor.enact_policy(remaining_policies)
+        return self.enact_from_hand(enacted_policy, remaining_policies)
+
+    async def execute_executive_action(self, policy):
+        if policy != 'Fascist':
+            return
+
+        power = self.start_executive_action()
+        if power is not None:
+            action = await self.decide(self.president)
+            target = self.players[action[1]] if action is not None else None
+            if power == Phase.INVESTIGATE:
+                if target is None:
+                    target = self.president.choose_player_to_investigate(self.players)
+                else:
+                    self.president.investigated_players.add(target.player_id)
+                self.investigate(target)
+            elif power == Phase.SPECIAL_ELECTION:
+                self.special_election(target or self.president.pick_next_president(self.players))
+            else:
+                self.execute(target or self.president.choose_player_to_kill(self.players))
+
+        self.is_game_over()
+
+
+class AsyncGameHost:
+    """
+    Runs many AsyncSecretHitlerGames concurrently on one event loop. At most
+    max_concurrent_games are in progress at a time; the others wait for a slot.
+    The engine itself runs on the loop, so too many concurrent games delay every
+    agent's answer and show up as timeouts; lower the limit if that happens.
+
+        host = AsyncGameHost(7, decision_timeout=0.5)
+        results = host.run(seeds, {0: LocalAgent(delay=0.01)})
+    """
+
+    def __init__(self, num_players=7, decision_timeout=1.0, max_concurrent_games=1000, log=SILENT_LOG):
+        self.num_players = num_players
+        self.decision_timeout = decision_timeout
+        self.max_concurrent_games = max_concurrent_games
+        self.log = log
+        self.games_played = 0
+        self.agent_decisions = 0
+        self.timeouts = 0
+        self.agent_errors = 0
+        self.illegal_actions = 0
+
+    async def play_game(self, seed, agents, slots=None):
+        """
+        Play one game from seed with the given agents and return its end_game() data.
+        """
+        if slots is None:
+            game, game_data = await self._play(seed, agents)
+        else:
+            # Games are built once they get a slot, so waiting games cost nothing and
+            # building them doesn't hold up the decision timers of the running ones
+            async with slots:
+                game, game_data = await self._play(seed, agents)
+        self.games_played += 1
+        self.agent_decisions += game.agent_decisions
+        self.timeouts += game.timeouts
+        self.agent_errors += game.agent_errors
+        self.illegal_actions += game.illegal_actions
+        return game_data
+
+    async def _play(self, seed, agents):
+        game = AsyncSecretHitlerGame(self.num_players, seed, agents=agents,
+                                     decision_timeout=self.decision_timeout, log=self.log)
+        return game, await game.start_game()
+
+    async def play_games(self, seeds, agents):
+        """
+        Play one game per seed concurrently. agents (player id -> agent) is shared
+        by every game; the results are in the order of seeds.
+        """
+        slots = asyncio.Semaphore(self.max_concurrent_games)
+        return await asyncio.gather(*[self.play_game(seed, agents, slots) for seed in seeds])
+
+    def run(self, seeds, agents):
+        """
+        Blocking entry point: play_games() on a new event loop.
+        """
+        return asyncio.run(self.play_games(seeds, agents))
@@ -0,0 +1,167 @@
+from functools import lru_cache
+from itertools import combinations
+
+import numpy as np
+
+from GameState import TOTAL_FASCIST_POLICIES, TOTAL_LIBERAL_POLICIES, Policy, Role, policy_code, role_code
+from SecretHitlerGame import ROLE_DISTRIBUTION
+
+# Probability that three cards drawn from a full deck are all Fascist, so that even
+# an all-Liberal government has to enact a Fascist policy
+FULL_DECK_ALL_FASCIST = (
+    (TOTAL_FASCIST_POLICIES * (TOTAL_FASCIST_POLICIES - 1) * (TOTAL_FASCIST_POLICIES - 2))
+    / ((TOTAL_LIBERAL_POLICIES + TOTAL_FASCIST_POLICIES) * (TOTAL_LIBERAL_POLICIES + TOTAL_FASCIST_POLICIES - 1)
+       * (TOTAL_LIBERAL_POLICIES + TOTAL_FASCIST_POLICIES - 2))
+)
+
+
+@lru_cache(maxsize=None)
+def role_assignments(num_players):
+    """
+    Every way to deal the roles of a num_players game, as a read-only
+    (assignments, num_players) int8 matrix of Role codes. There are at most
+    10 * C(9, 3) = 840 of them.
+    """
+    num_liberals, num_fascists = ROLE_DISTRIBUTION[num_players]
+    assignments = []
+    for hitler in range(num_players):
+        others = [player_id for player_id in range(num_players) if player_id != hitler]
+        for fascists in combinations(others, num_fascists):
+            roles = [Role.LIBERAL] * num_players
+            roles[hitler] = Role.HITLER
+            for player_id in fascists:
+                roles[player_id] = Role.FASCIST
+            assignments.append(roles)
+    assignments = np.array(assignments, dtype=np.int8)
+    assignments.flags.writeable = False
+    return assignments
+
+
+class BeliefTracker:
+    """
+    One player's probability distribution over the hidden role assignment.
+
+    Every possible assignment is enumerated once per player count and carries a
+    weight; each event multiplies in its likelihood, so an update costs one
+    vectorised pass over the assignments instead of a recomputation from the
+    start of the game. Attach the tracker to a GameState with add_observer() and
+    it is updated by the same update_after_* calls that update the state:
+
+      legislation  a Fascist policy makes it likelier the government holds a Fascist
+      enactment    from the third Fascist policy on, a Chancellor who didn't win is not Hitler
+      investigation  the investigated player's party is known, to the investigator
+      killed       a killed player whose death didn't end the game was not Hitler
+
+    fascist_bias is how likely a government with a Fascist (or Hitler) in it is to
+    enact a Fascist policy when it had a Liberal one to choose. forced_fascist_rate
+    is how often a government is dealt three Fascist policies, which forces even
+    Liberals to enact one.
+    """
+
+    def __init__(self, num_players, player_id, role, fascist_bias=0.5, forced_fascist_rate=FULL_DECK_ALL_FASCIST):
+        self.num_players = num_players
+        self.player_id = player_id
+        self.fascist_bias = fascist_bias
+        self.forced_fascist_rate = forced_fascist_rate
+        self.assignments = role_assignments(num_players)
+        self.fascist_team = self.assignments >= Role.FASCIST
+        self.hitler = self.assignments == Role.HITLER
+        # Float copies so the marginals are a plain matrix-vector product
+        self.fascist_indicator = self.fascist_team.astype(np.float64)
+        self.hitler_indicator = self.hitler.astype(np.float64)
+        self.weights = np.ones(len(self.assignments))
+        self.marginals = None  # (P(Fascist), P(Hitler)) cached until the next update
+        self.observe_role(player_id, role)
+
+    def observe_role(self, player_id, role):
+        """
+        Rule out every assignment that doesn't give player_id role, e.g. when
+        Fascists learn who their teammates are.
+        """
+        self.constrain(self.assignments[:, player_id] == role_code(role))
+
+    def observe_party(self, player_id, party):
+        """
+        Rule out every assignment that doesn't put player_id in party ('Liberal' or
+        'Fascist'; Hitler belongs to the Fascist party).
+        """
+        self.constrain(self.fascist_team[:, player_id] == (policy_code(party) == Policy.FASCIST))
+
+    def constrain(self, consistent):
+        self.reweight(np.where(consistent, 1.0, 0.0))
+
+    def reweight(self, likelihood):
+        weights = self.weights * likelihood
+        total = weights.sum()
+        if total <= 0:
+            # The evidence contradicts every assignment still possible, so ignore it
+            return
+        self.weights = weights / total
+        self.marginals = None
+
+    # GameState observer interface
+
+    def observe_enactment(self, game_state):
+        """
+        The game checks for Hitler as Chancellor after every enactment once three
+        Fascist policies are in, so the nominated Chancellor of a game that goes on
+        is not Hitler. (When it doesn't go on, the beliefs no longer matter.)
+        """
+        chancellor_id = game_state.nominated_chancellor
+        if chancellor_id is not None and game_state.enacted_fascist_policies >= 3:
+            self.constrain(~self.hitler[:, chancellor_id])
+
+    def update_after_election(self, game_state, president_id, chancellor_id, election_succeeded):
+        # The game only checks for Hitler as Chancellor once a policy is enacted, so an
+        # elected Chancellor may still be Hitler until then (see observe_enactment)
+        pass
+
+    def update_after_legislation(self, game_state, policy_type):
+        # Every nominated government draws a hand, elected or not, and the state's
+        # current_president/current_chancellor only follow elected ones
+        self.observe_enactment(game_state)
+        president_id, chancellor_id = game_state.presidential_candidate, game_state.nominated_chancellor
+        if president_id is None or chancellor_id is None:
+            return
+        fascist_government = self.fascist_team[:, president_id] | self.fascist_team[:, chancellor_id]
+        forced = self.forced_fascist_rate
+        fascist_likelihood = forced + (1 - forced) * self.fascist_bias
+        if policy_code(policy_type) == Policy.FASCIST:
+            self.reweight(np.where(fascist_government, fascist_likelihood, forced))
+        else:
+            self.reweight(np.where(fascist_government, 1 - fascist_likelihood, 1 - forced))
+
+    def update_after_top_deck(self, game_state, policy_type):
+        # Nobody chose a top-decked policy, but the game still checks the rejected Chancellor
+        self.observe_enactment(game_state)
+
+    def update_after_investigation(self, game_state, investigator_id, investigated_id, party_membership):
+        # Every observer hears of the investigation, but only the President sees the result
+        if investigator_id == self.player_id and party_membership is not None:
+            self.observe_party(investigated_id, party_membership)
+
+    def player_killed(self, game_state, player_id):
+        # Killing Hitler ends the game straight away, so any other kill reveals a non-Hitler
+        self.constrain(~self.hitler[:, player_id])
+
+    # Queries
+
+    def _marginals(self):
+        if self.marginals is None:
+            self.marginals = (self.weights @ self.fascist_indicator, self.weights @ self.hitler_indicator)
+        return self.marginals
+
+    def fascist_probabilities(self):
+        """
+        P(player is in the Fascist party, Hitler included) for every player.
+        """
+        return self._marginals()[0]
+
+    def hitler_probabilities(self):
+        return self._marginals()[1]
+
+    def most_likely_assignment(self):
+        return self.assignments[int(self.weights.argmax())]
+
+    def possible_assignments(self):
+        return int(np.count_nonzero(self.weights))
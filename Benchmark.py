@@ -0,0 +1,165 @@
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from ActionSpace import action_space_for
+from EventLog import SILENT_LOG
+from GameMetrics import PHASES, GameMetrics
+from SecretHitlerGame import ROLE_DISTRIBUTION, SecretHitlerGame
+from SimulationRunner import game_seeds
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+AGENTS = ('random', 'model')
+IMPORT_MODULES = ('SecretHitlerGame', 'SimulationRunner', 'Main')
+
+
+class UniformModel:
+    """
+    Stand-in for a trained model: scores every action equally, so model-driven
+    players pay the full encode/predict/postprocess cost of a real model.
+    """
+
+    def __init__(self, num_players):
+        self.num_actions = len(action_space_for(num_players))
+
+    def predict(self, features):
+        return np.ones(features.shape[:-1] + (self.num_actions,), dtype=np.float32)
+
+
+def peak_memory_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def measure_import_times(modules=IMPORT_MODULES):
+    """
+    Seconds to import each module in a fresh interpreter, which every CLI call and
+    newly started worker pays, and whether the import loaded NumPy.
+    """
+    code = ("import sys, time; start = time.perf_counter(); import {module}; "
+            "print(time.perf_counter() - start, 'numpy' in sys.modules)")
+    package_path = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for module in modules:
+        output = subprocess.run([sys.executable, '-c', code.format(module=module)], cwd=package_path,
+                                stdout=subprocess.PIPE, universal_newlines=True, check=True).stdout.split()
+        results[module] = {'seconds': float(output[0]), 'numpy_loaded': output[1] == 'True'}
+    return results
+
+
+def play_workload(num_players, agent, num_games, seed, metrics=None):
+    """
+    Play num_games fixed-seed games in this process and return the latency of
+    each and the number of rounds played.
+    """
+    model = UniformModel(num_players) if agent == 'model' else None
+    latencies = []
+    rounds = 0
+    for game_seed in game_seeds(num_games, seed):
+        game = SecretHitlerGame(num_players, seed=game_seed, log=SILENT_LOG, metrics=metrics)
+        if model is not None:
+            for player in game.players:
+                player.model = model
+        start = time.perf_counter()
+        game_data = game.start_game()
+        latencies.append(time.perf_counter() - start)
+        rounds += game_data['rounds']
+    return latencies, rounds
+
+
+def run_workload(num_players, agent, num_games, seed):
+    """
+    Time num_games fixed-seed games without instrumentation, then play them again
+    with GameMetrics for the phase breakdown and counters, tracing allocations
+    for the workload's own peak memory.
+    """
+    latencies, rounds = play_workload(num_players, agent, num_games, seed)
+    total = sum(latencies)
+    latencies.sort()
+
+    metrics = GameMetrics()
+    tracemalloc.start()
+    try:
+        instrumented_latencies, _ = play_workload(num_players, agent, num_games, seed, metrics)
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    instrumented_total = sum(instrumented_latencies)
+
+    return {
+        'num_players': num_players,
+        'agent': agent,
+        'games': num_games,
+        'seed': seed,
+        'games_per_sec': num_games / total,
+        'steps_per_sec': rounds / total,
+        'latency_p50_ms': 1000 * latencies[int(0.50 * (num_games - 1))],
+        'latency_p99_ms': 1000 * latencies[int(0.99 * (num_games - 1))],
+        'phase_seconds': dict(metrics.phase_seconds),  # From the instrumented run
+        'phase_share': {phase: metrics.phase_seconds[phase] / instrumented_total for phase in PHASES},
+        'counters': dict(metrics.counters),
+        'peak_memory_mb': peak / (1024 * 1024),  # Peak of the memory allocated by Python during this workload
+    }
+
+
+def run_benchmarks(player_counts, agents, num_games, seed):
+    return {
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'imports': measure_import_times(),
+        'results': [run_workload(num_players, agent, num_games, seed)
+                    for num_players in player_counts for agent in agents],
+    }
+
+
+def format_result(result):
+    shares = ', '.join(f"{phase} {share:.0%}" for phase, share in result['phase_share'].items())
+    return (f"{result['num_players']:>2} players, {result['agent']:<6}: "
+            f"{result['games_per_sec']:9.1f} games/s {result['steps_per_sec']:10.1f} steps/s "
+            f"p50 {result['latency_p50_ms']:.3f} ms p99 {result['latency_p99_ms']:.3f} ms "
+            f"peak {result['peak_memory_mb']:.2f} MB ({shares})")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark SecretHitlerGame on fixed-seed workloads.")
+    parser.add_argument('--games', type=int, default=500, help="games per workload")
+    parser.add_argument('--players', type=int, nargs='+', default=sorted(ROLE_DISTRIBUTION), help="player counts to run")
+    parser.add_argument('--agents', nargs='+', choices=AGENTS, default=list(AGENTS), help="player types to run")
+    parser.add_argument('--seed', type=int, default=0, help="master seed of every workload")
+    parser.add_argument('--output', default=None, metavar='PATH', help="write the results to PATH as JSON")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    report = run_benchmarks(args.players, args.agents, args.games, args.seed)
+    for result in report['results']:
+        print(format_result(result))
+    print("Import time: " + ', '.join(f"{module} {1000 * result['seconds']:.1f} ms"
+                                      + (" (loads NumPy)" if result['numpy_loaded'] else "")
+                                      for module, result in report['imports'].items()))
+    peak = peak_memory_mb()
+    if peak is not None:
+        print(f"Process peak memory: {peak:.1f} MB")
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
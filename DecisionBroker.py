@@ -0,0 +1,137 @@
+import threading
+import time
+from concurrent.futures import Future
+
+from ActionSpace import action_space_for, legal_action_mask
+from FeatureEncoder import encoder_for
+
+
+class DecisionBroker:
+    """
+    Collects the decisions requested by model-driven players across any number of
+    concurrent games and answers them with one batched model.predict call.
+
+    Players call decide() (blocking) or submit() (returns a Future). Each request's
+    features and legal action mask are written straight into the next row of the
+    pending batch matrices. A pending batch
+    is sent to the model as soon as it holds max_batch_size rows, or once its oldest
+    request has waited max_wait seconds. All players sharing a broker must be in
+    games with the same number of players.
+    """
+
+    def __init__(self, model, max_batch_size=256, max_wait=0.002):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.pending = []  # List of (player, future) waiting for a batch
+        self.batch_features = None  # Matrices the pending requests are encoded into
+        self.batch_masks = None
+        self.oldest_request_time = None
+        self.batches_predicted = 0
+        self.decisions_made = 0
+        self.condition = threading.Condition()
+        self.closed = False
+        self.worker = threading.Thread(target=self._run, name="DecisionBroker", daemon=True)
+        self.worker.start()
+
+    def submit(self, player, game_state):
+        """
+        Queue a decision for player and return a Future resolving to the action
+        chosen by postprocess_action.
+        """
+        future = Future()
+        full_batch = None
+        with self.condition:
+            if self.closed:
+                raise RuntimeError("DecisionBroker is closed")
+            if not self.pending:
+                self.oldest_request_time = time.monotonic()
+                self.batch_features = encoder_for(game_state.num_players).new_buffer(self.max_batch_size)
+                self.batch_masks = action_space_for(game_state.num_players).new_mask(self.max_batch_size)
+                # Wake the worker so it starts the max_wait countdown for this batch
+                self.condition.notify()
+            row = len(self.pending)
+            player.preprocess_state(game_state, out=self.batch_features[row])
+            legal_action_mask(game_state, player.player_id, out=self.batch_masks[row])
+            self.pending.append((player, future))
+            if len(self.pending) >= self.max_batch_size:
+                full_batch = self._take_batch()
+        if full_batch:
+            # The request that fills a batch sends it right away instead of waking the worker
+            self._predict(*full_batch)
+        return future
+
+    def decide(self, player, game_state):
+        return self.submit(player, game_state).result()
+
+    def flush(self):
+        """
+        Predict everything pending right now instead of waiting for the batch to fill.
+        """
+        with self.condition:
+            batch = self._take_batch()
+        self._predict(*batch)
+
+    def close(self):
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        self.worker.join()
+        self.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def _take_batch(self):
+        requests = self.pending
+        features = self.batch_features[:len(requests)] if requests else None
+        masks = self.batch_masks[:len(requests)] if requests else None
+        self.pending = []
+        self.batch_features = None
+        self.batch_masks = None
+        self.oldest_request_time = None
+        return requests, features, masks
+
+    def _run(self):
+        while True:
+            with self.condition:
+                while not self.closed:
+                    if self.pending:
+                        remaining = self.oldest_request_time + self.max_wait - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(remaining)
+                    else:
+                        self.condition.wait()
+                if self.closed:
+                    return
+                batch = self._take_batch()
+            self._predict(*batch)
+
+    def _predict(self, requests, features, masks):
+        if not requests:
+            return
+        try:
+            predictions = self.model.predict(features)
+        except Exception as error:
+            for _, future in requests:
+                future.set_exception(error)
+            return
+        if len(predictions) != len(requests):
+            # zip() would leave the unmatched requests waiting forever
+            error = ValueError(f"The model returned {len(predictions)} predictions for {len(requests)} requests")
+            for _, future in requests:
+                future.set_exception(error)
+            return
+        self.batches_predicted += 1
+        self.decisions_made += len(requests)
+
+        # Each row of the batched output belongs to the player that queued it
+        for (player, future), prediction, legal_mask in zip(requests, predictions, masks):
+            try:
+                future.set_result(player.postprocess_action(prediction, legal_mask))
+            except Exception as error:
+                future.set_exception(error)
@@ -0,0 +1,90 @@
+import collections
+import json
+import sys
+
+DEBUG = 10
+INFO = 20
+WARNING = 30
+SILENT = 100
+
+LEVEL_NAMES = {DEBUG: 'debug', INFO: 'info', WARNING: 'warning', SILENT: 'silent'}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+
+class RingBufferSink:
+    """
+    Keeps the most recent events in memory, e.g. to replay the end of a game that
+    went wrong.
+    """
+
+    def __init__(self, capacity=10000, level=DEBUG):
+        self.level = level
+        self.events = collections.deque(maxlen=capacity)
+
+    def emit(self, event):
+        self.events.append(event)
+
+
+class JsonlSink:
+    """
+    Writes one JSON object per event to a file.
+    """
+
+    def __init__(self, path, level=DEBUG):
+        self.level = level
+        self.file = open(path, 'a')
+
+    def emit(self, event):
+        self.file.write(json.dumps(event) + '\n')
+
+    def close(self):
+        self.file.close()
+
+
+class EventLog:
+    """
+    Levelled game log with optional structured sinks.
+
+    Text lines go to stream when their level is at least level. Every event also
+    goes, as a dict, to each sink whose level it reaches. Call sites check the
+    debug/info/warning flags before building an event, so a log where nothing is
+    enabled (SILENT and no sinks) costs one attribute lookup per event and never
+    formats a string.
+    """
+
+    def __init__(self, level=DEBUG, stream=None, sinks=()):
+        self.level = level
+        self.stream = stream if stream is not None else sys.stdout
+        self.sinks = list(sinks)
+        self.update_enabled()
+
+    def update_enabled(self):
+        lowest = min([self.level] + [sink.level for sink in self.sinks])
+        self.debug = lowest <= DEBUG
+        self.info = lowest <= INFO
+        self.warning = lowest <= WARNING
+
+    def set_level(self, level):
+        self.level = level
+        self.update_enabled()
+
+    def add_sink(self, sink):
+        self.sinks.append(sink)
+        self.update_enabled()
+
+    def event(self, level, name, message, **fields):
+        """
+        Emit an event. message is a str.format template filled from fields, and is
+        only formatted if the text output is enabled for level.
+        """
+        if level >= self.level:
+            self.stream.write(message.format(**fields) + '\n')
+        if self.sinks:
+            event = dict(fields, event=name, level=LEVEL_NAMES.get(level, level))
+            for sink in self.sinks:
+                if level >= sink.level:
+                    sink.emit(event)
+
+
+# Shared log for headless runs that want no output at all
+SILENT_LOG = EventLog(SILENT)
@@ -0,0 +1,141 @@
+import numpy as np
+
+from GameState import (ALIVE, ELIGIBLE, INVESTIGATED, TOTAL_FASCIST_POLICIES, TOTAL_LIBERAL_POLICIES,
+                       Role, role_code)
+
+# How many of the most recent governments (successful or not) are encoded
+ENCODED_GOVERNMENTS = 3
+
+
+class FeatureEncoder:
+    """
+    Encodes a GameState from one player's point of view into a fixed-length float32
+    vector, writing straight into a buffer supplied by the caller.
+
+    Feature layout for n players (see layout for the exact slices):
+      liberal_policies          1   enacted Liberal policies / 6
+      fascist_policies          1   enacted Fascist policies / 11
+      election_tracker          1   failed elections / 3
+      alive                     n   1 if the player is alive
+      veto_power                1   1 if veto power is active
+      deck_composition          2   known Liberal and Fascist fractions of the deck
+      own_role                  3   one-hot Liberal, Fascist, Hitler
+      investigated_liberal      n   1 if the player was investigated and is a Liberal
+      investigated_fascist      n   1 if the player was investigated and is a Fascist
+      chancellor_eligibility    n   1 if the player may be nominated Chancellor
+      governments               3 * (2n + 1), most recent first, zeros when there is no such
+                                    government: one-hot President, one-hot Chancellor, elected flag
+
+    That is 12 + 10n features; the first 9 + n match the original preprocess_state.
+    """
+
+    def __init__(self, num_players):
+        self.num_players = num_players
+        n = num_players
+        sizes = (
+            ('liberal_policies', 1),
+            ('fascist_policies', 1),
+            ('election_tracker', 1),
+            ('alive', n),
+            ('veto_power', 1),
+            ('deck_composition', 2),
+            ('own_role', 3),
+            ('investigated_liberal', n),
+            ('investigated_fascist', n),
+            ('chancellor_eligibility', n),
+            ('governments', ENCODED_GOVERNMENTS * (2 * n + 1)),
+        )
+        self.layout = {}
+        offset = 0
+        for name, size in sizes:
+            self.layout[name] = slice(offset, offset + size)
+            offset += size
+        self.feature_length = offset
+
+        self.alive = self.layout['alive'].start
+        self.own_role = self.layout['own_role'].start
+        self.investigated_liberal = self.layout['investigated_liberal']
+        self.investigated_fascist = self.layout['investigated_fascist']
+        self.eligibility = self.layout['chancellor_eligibility']
+        self.governments = self.layout['governments'].start
+
+    def new_buffer(self, batch_size=None):
+        shape = (self.feature_length,) if batch_size is None else (batch_size, self.feature_length)
+        return np.zeros(shape, dtype=np.float32)
+
+    def encode(self, game_state, role, out=None, known_investigations=None):
+        """
+        Encode game_state as seen by a player holding role into out, a float32
+        vector of feature_length (e.g. one row of a batch matrix). A new vector is
+        allocated only when out is not given. Only the investigation results of the
+        players in known_investigations (the player's own investigations) are
+        encoded; None encodes every result game_state holds.
+        """
+        if out is None:
+            out = self.new_buffer()
+        n = self.num_players
+        data = game_state.player_data
+        player_data = np.frombuffer(data, np.uint8)
+
+        out[0] = game_state.enacted_liberal_policies / TOTAL_LIBERAL_POLICIES
+        out[1] = game_state.enacted_fascist_policies / TOTAL_FASCIST_POLICIES
+        out[2] = game_state.failed_elections_count / 3
+
+        out[self.alive:self.alive + n] = player_data[ALIVE * n:(ALIVE + 1) * n]
+        veto = self.alive + n
+        out[veto] = 1 if game_state.veto_power_active else 0
+        total_policies = game_state.known_liberal_policies + game_state.known_fascist_policies
+        if total_policies:
+            out[veto + 1] = game_state.known_liberal_policies / total_policies
+            out[veto + 2] = game_state.known_fascist_policies / total_policies
+        else:
+            out[veto + 1] = out[veto + 2] = 0
+
+        own_role = self.own_role
+        code = role_code(role) if role is not None else Role.UNKNOWN
+        out[own_role] = 1 if code == Role.LIBERAL else 0
+        out[own_role + 1] = 1 if code == Role.FASCIST else 0
+        out[own_role + 2] = 1 if code == Role.HITLER else 0
+
+        # Everything after the own role is sparse: clear it once, then set the ones
+        out[self.investigated_liberal.start:] = 0
+        investigated = INVESTIGATED * n
+        if data.count(0, investigated, investigated + n) != n:
+            for player_id in range(n):
+                result = data[investigated + player_id]
+                if known_investigations is not None and player_id not in known_investigations:
+                    continue
+                if result == Role.LIBERAL:
+                    out[self.investigated_liberal.start + player_id] = 1
+                elif result:
+                    out[self.investigated_fascist.start + player_id] = 1
+        out[self.eligibility] = player_data[ELIGIBLE * n:(ELIGIBLE + 1) * n]
+
+        # Walk the persistent government log from the newest entry
+        start = self.governments
+        node = game_state.government_log.node
+        for _ in range(ENCODED_GOVERNMENTS):
+            if node is None:
+                break
+            president_id, chancellor_id, election_succeeded = node[0]
+            out[start + president_id] = 1
+            out[start + n + chancellor_id] = 1
+            if election_succeeded:
+                out[start + 2 * n] = 1
+            start += 2 * n + 1
+            node = node[1]
+
+        return out
+
+
+_encoders = {}
+
+
+def encoder_for(num_players):
+    """
+    Shared FeatureEncoder for a player count.
+    """
+    encoder = _encoders.get(num_players)
+    if encoder is None:
+        encoder = _encoders[num_players] = FeatureEncoder(num_players)
+    return encoder
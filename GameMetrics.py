@@ -0,0 +1,102 @@
+import cProfile
+import pstats
+import time
+
+PHASES = ('conduct_election', 'execute_legislative_session', 'execute_executive_action')
+COUNTERS = ('games', 'elections', 'failed_elections', 'reshuffles', 'executive_actions', 'model_calls')
+
+
+class GameMetrics:
+    """
+    Counters and per-phase timers filled in by the SecretHitlerGame instances it is
+    attached to (SecretHitlerGame(..., metrics=metrics)). One GameMetrics can be
+    shared by any number of games played one after another.
+
+    Games without metrics skip all of this behind a single None check per phase.
+
+    To profile a subset of games, pass profile_every=N to run every Nth game
+    under a profiler. profiler_factory must return an object with
+    enable()/disable(). The default is cProfile.Profile, and profile_stats()
+    merges the cProfile results.
+    """
+
+    def __init__(self, profile_every=0, profiler_factory=cProfile.Profile):
+        self.counters = {name: 0 for name in COUNTERS}
+        self.phase_seconds = {phase: 0.0 for phase in PHASES}
+        self.phase_calls = {phase: 0 for phase in PHASES}
+        self.profile_every = profile_every
+        self.profiler_factory = profiler_factory
+        self.profiles = []
+
+    def increment(self, counter, amount=1):
+        self.counters[counter] += amount
+
+    def start_game(self):
+        """
+        Count a new game and return the profiler to run it under, if it was selected.
+        """
+        self.counters['games'] += 1
+        if self.profile_every and self.counters['games'] % self.profile_every == 0:
+            profiler = self.profiler_factory()
+            self.profiles.append(profiler)
+            profiler.enable()
+            return profiler
+        return None
+
+    def finish_game(self, game, profiler):
+        if profiler is not None:
+            profiler.disable()
+        self.counters['model_calls'] += sum(player.model_calls for player in game.players)
+
+    def run_phase(self, phase, method, *args):
+        start = time.perf_counter()
+        try:
+            return method(*args)
+        finally:
+            self.phase_seconds[phase] += time.perf_counter() - start
+            self.phase_calls[phase] += 1
+
+    def profile_stats(self):
+        """
+        Merge the cProfile results of every profiled game, or None if none were.
+        """
+        profiles = [profiler for profiler in self.profiles if isinstance(profiler, cProfile.Profile)]
+        if not profiles:
+            return None
+        stats = pstats.Stats(profiles[0])
+        for profiler in profiles[1:]:
+            stats.add(profiler)
+        return stats
+
+    def merge(self, other):
+        """
+        Add another GameMetrics' counts and timings (e.g. from a worker process) to this one.
+        """
+        for name, value in other.counters.items():
+            self.counters[name] += value
+        for phase in PHASES:
+            self.phase_seconds[phase] += other.phase_seconds[phase]
+            self.phase_calls[phase] += other.phase_calls[phase]
+
+    def as_dict(self):
+        return {
+            'counters': dict(self.counters),
+            'phase_seconds': dict(self.phase_seconds),
+            'phase_calls': dict(self.phase_calls),
+        }
+
+    def to_prometheus(self, prefix='secret_hitler_'):
+        """
+        The metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        for name, value in self.counters.items():
+            lines.append(f"# TYPE {prefix}{name}_total counter")
+            lines.append(f"{prefix}{name}_total {value}")
+        lines.append(f"# TYPE {prefix}phase_seconds_total counter")
+        for phase, seconds in self.phase_seconds.items():
+            lines.append(f'{prefix}phase_seconds_total{{phase="{phase}"}} {seconds:.9f}')
+        lines.append(f"# TYPE {prefix}phase_calls_total counter")
+        for phase, calls in self.phase_calls.items():
+            lines.append(f'{prefix}phase_calls_total{{phase="{phase}"}} {calls}')
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,56 @@
+from SecretHitlerGame import SecretHitlerGame
+
+
+class GamePool:
+    """
+    Recycles SecretHitlerGame instances for back-to-back games. acquire() hands out
+    a released game reset in place for a new seed, so its players, GameState and
+    deck lists are reused instead of reallocated; a new game is only built when
+    the pool is empty.
+
+        pool = GamePool(7, log=SILENT_LOG)
+        game_data = pool.play(seed)
+
+    Every game in the pool shares the recorder, log and metrics given here.
+    """
+
+    def __init__(self, num_players=7, max_size=None, **game_options):
+        self.num_players = num_players
+        self.max_size = max_size  # Games kept for reuse beyond this are dropped on release
+        self.game_options = game_options
+        self.free = []
+        self.created = 0
+
+    def acquire(self, seed=None):
+        """
+        A game ready to start from seed.
+        """
+        if self.free:
+            game = self.free.pop()
+            game.reset(seed)
+            return game
+        self.created += 1
+        return SecretHitlerGame(self.num_players, seed=seed, **self.game_options)
+
+    def release(self, game):
+        """
+        Hand a game back for reuse. The caller must not touch it afterwards.
+        """
+        if self.max_size is not None and len(self.free) >= self.max_size:
+            return
+        # Pooled games are anonymous, so their per-game history would only pile up
+        game.collected_data.clear()
+        self.free.append(game)
+
+    def play(self, seed=None):
+        """
+        Play one game from seed on a pooled instance and return its end_game() data.
+        """
+        game = self.acquire(seed)
+        try:
+            return game.start_game()
+        finally:
+            self.release(game)
+
+    def __len__(self):
+        return len(self.free)
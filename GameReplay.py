@@ -0,0 +1,294 @@
+import os
+import struct
+from bisect import bisect_right
+
+from ActionSpace import action_space_for
+from EventLog import SILENT_LOG
+from Player import Player
+from SecretHitlerGame import SecretHitlerGame
+from SimulationRunner import worker_pool
+
+# Corpus record header: player count, seed, number of decisions
+RECORD_HEADER = struct.Struct('<BQI')
+
+
+class GameRecord:
+    """
+    Everything needed to replay a game: its seed, which fixes the roles and every
+    shuffle of the deck, and the ActionSpace index of every decision in the order
+    they were made, one byte each.
+    """
+
+    def __init__(self, num_players, seed, actions):
+        self.num_players = num_players
+        self.seed = seed
+        self.actions = bytes(actions)
+
+    def __len__(self):
+        return len(self.actions)
+
+    def to_bytes(self):
+        if not isinstance(self.seed, int) or not 0 <= self.seed < 2 ** 64:
+            raise ValueError(f"Only games with 64-bit integer seeds can be stored, got {self.seed!r}")
+        return RECORD_HEADER.pack(self.num_players, self.seed, len(self.actions)) + self.actions
+
+    @classmethod
+    def from_bytes(cls, data, offset=0):
+        """
+        The record starting at offset in data, and the offset just past it.
+        """
+        num_players, seed, length = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        return cls(num_players, seed, data[start:start + length]), start + length
+
+
+def write_corpus(path, records):
+    with open(path, 'wb') as f:
+        for record in records:
+            f.write(record.to_bytes())
+
+
+def read_corpus(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    records = []
+    offset = 0
+    while offset < len(data):
+        record, offset = GameRecord.from_bytes(data, offset)
+        records.append(record)
+    return records
+
+
+class ActionLogRecorder:
+    """
+    A recorder (see SecretHitlerGame's recorder argument) that keeps a GameRecord
+    of every finished game in records. It stores a few bytes per decision, where
+    TrajectoryRecorder stores full feature vectors.
+
+        recorder = ActionLogRecorder()
+        pool = GamePool(7, recorder=recorder, log=SILENT_LOG)
+        for seed in seeds:
+            pool.play(seed)
+        write_corpus('games.bin', recorder.records)
+    """
+
+    def __init__(self):
+        self.games = {}  # id(game) -> (bytearray of the game's decisions so far, ActionSpace indices)
+        self.records = []
+
+    def record_decision(self, game, player, action):
+        entry = self.games.get(id(game))
+        if entry is None:
+            entry = self.games[id(game)] = (bytearray(), action_space_for(game.num_players).indices)
+        entry[0].append(entry[1][action])
+
+    def finish_game(self, game):
+        entry = self.games.pop(id(game), None)
+        self.records.append(GameRecord(game.num_players, game.seed, entry[0] if entry is not None else b''))
+
+
+class ReplayPaused(Exception):
+    """
+    Raised inside a replay when it reaches the decision it was asked to stop at.
+    """
+
+
+class ReplayPlayer(Player):
+    """
+    A player whose decisions are read from the replay's action log.
+    """
+
+    def __init__(self, player_id, replay, rng=None):
+        super().__init__(player_id, rng=rng)
+        self.replay = replay
+
+    def uses_model(self):
+        return True
+
+    def reset(self, role, seed=None):
+        super().reset(role)  # Replayed decisions never use the RNG, so it isn't reseeded
+
+    def make_decision(self, game_state):
+        return self.replay.next_action()
+
+
+class Checkpoint:
+    """
+    A game's complete state at the start of a round, before the step-th decision:
+    everything a replay from the seed would have built up by then.
+    """
+
+    def __init__(self, game, step):
+        self.step = step
+        self.state = game.state.clone()
+        self.rng_state = game.rng.getstate()
+        self.policy_deck = list(game.policy_deck)
+        self.discarded_policies = list(game.discarded_policies)
+        self.president = game.president.player_id if game.president else None
+        self.chancellor = game.chancellor.player_id if game.chancellor else None
+        self.counters = (game.liberal_policies_enacted, game.fascist_policies_enacted, game.election_tracker,
+                         game.rounds_played, game.hitler_assassinated)
+        self.players = [(player.is_alive, tuple(player.investigated_players)) for player in game.players]
+
+    def restore(self, game):
+        """
+        Put game, which must have been dealt from the same seed, back into this state.
+        """
+        game.state = self.state.clone()
+        game.rng.setstate(self.rng_state)
+        game.policy_deck[:] = self.policy_deck
+        game.discarded_policies[:] = self.discarded_policies
+        game.president = game.players[self.president] if self.president is not None else None
+        game.chancellor = game.players[self.chancellor] if self.chancellor is not None else None
+        (game.liberal_policies_enacted, game.fascist_policies_enacted, game.election_tracker,
+         game.rounds_played, game.hitler_assassinated) = self.counters
+        game.game_ended = False
+        for player, (is_alive, investigated_players) in zip(game.players, self.players):
+            player.is_alive = is_alive
+            player.investigated_players.clear()
+            player.investigated_players.update(investigated_players)
+            player.game_state = game.state
+
+
+class ReplayGame(SecretHitlerGame):
+    """
+    A silent SecretHitlerGame whose players follow a GameReplay's action log, and
+    which takes a Checkpoint at the start of every checkpoint_interval-th round.
+    """
+
+    def __init__(self, replay, checkpoint_interval=None):
+        self.replay = replay
+        self.checkpoint_interval = checkpoint_interval
+        record = replay.record
+        super().__init__(record.num_players, record.seed, log=SILENT_LOG,
+                         player_factory=lambda player_id, rng: ReplayPlayer(player_id, replay, rng=rng))
+
+    def conduct_election(self):
+        interval = self.checkpoint_interval
+        if interval is not None and self.rounds_played % interval == 0:
+            self.replay.add_checkpoint(Checkpoint(self, self.replay.position))
+        super().conduct_election()
+
+
+class GameReplay:
+    """
+    Reconstructs the exact state of a recorded game at any decision.
+
+    The game is replayed once up front, taking a Checkpoint every
+    checkpoint_interval rounds. seek(step) then restores the last checkpoint
+    before step and replays from there, so it never replays more than
+    checkpoint_interval rounds of decisions.
+
+        replay = GameReplay(record)
+        state = replay.state_at(12)   # The GameState the 13th decision was made in
+    """
+
+    def __init__(self, record, checkpoint_interval=1):
+        self.checkpoint_interval = checkpoint_interval
+        self.game = None
+        self.load(record)
+
+    def load(self, record):
+        """
+        Replay record from the start, taking new checkpoints. The game is reset in
+        place when record has as many players as the one before, which makes a
+        GameReplay cheap to reuse across a corpus.
+        """
+        self.record = record
+        self.actions = record.actions
+        self.length = len(record.actions)
+        self.checkpoints = []
+        self.position = 0
+        self.stop_at = None
+        if self.game is None or self.game.num_players != record.num_players:
+            self.decoded_actions = action_space_for(record.num_players).actions
+            self.game = ReplayGame(self, self.checkpoint_interval)
+        else:
+            self.game.reset(record.seed)
+        self.result = self.game.start_game()
+        if self.position != self.length:
+            raise ValueError(f"The game ended after {self.position} of {self.length} logged decisions")
+        return self.result
+
+    def __len__(self):
+        return self.length
+
+    def add_checkpoint(self, checkpoint):
+        # Replays after a seek pass the same round starts again
+        if not self.checkpoints or checkpoint.step > self.checkpoints[-1].step:
+            self.checkpoints.append(checkpoint)
+
+    def next_action(self):
+        position = self.position
+        if position == self.stop_at:
+            raise ReplayPaused()
+        if position >= self.length:
+            raise ValueError(f"The action log ended after {position} decisions, before the game did")
+        self.position = position + 1
+        return self.decoded_actions[self.actions[position]]
+
+    def seek(self, step):
+        """
+        Replay up to the step-th decision (counting from 0) and return the game,
+        paused as it asks for that decision. With step == len(self), the game is
+        played to its end. The game is for inspection only: it can't be resumed.
+        """
+        if not 0 <= step <= self.length:
+            raise IndexError(f"Step {step} is outside this game's {self.length} decisions")
+        if not self.checkpoints:
+            raise ValueError("This replay was made without checkpoints, so it can't seek")
+        index = bisect_right([checkpoint.step for checkpoint in self.checkpoints], step) - 1
+        checkpoint = self.checkpoints[index]
+        checkpoint.restore(self.game)
+        self.position = checkpoint.step
+        self.stop_at = step if step < self.length else None
+        try:
+            self.game.start_game()
+        except ReplayPaused:
+            pass
+        finally:
+            self.stop_at = None
+            self.game.collected_data.clear()
+        return self.game
+
+    def state_at(self, step):
+        """
+        A copy of the GameState at the step-th decision.
+        """
+        return self.seek(step).state.clone()
+
+
+def replay_games(records):
+    """
+    Replay every record to its end without checkpoints and return the end_game()
+    data of each. Nothing is decided, logged or recorded, so this is much cheaper
+    than playing the games.
+    """
+    replays = {}  # One reused GameReplay per player count
+    results = []
+    for record in records:
+        replay = replays.get(record.num_players)
+        if replay is None:
+            replays[record.num_players] = GameReplay(record, checkpoint_interval=None)
+            results.append(replays[record.num_players].result)
+        else:
+            results.append(replay.load(record))
+    return results
+
+
+def replay_corpus(path, workers=None, chunk_size=None):
+    """
+    replay_games() over a corpus file written by write_corpus, split across
+    worker processes like run_simulations.
+    """
+    records = read_corpus(path)
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        return replay_games(records)
+    if chunk_size is None:
+        chunk_size = max(1, len(records) // (workers * 4))
+    chunks = [records[i:i + chunk_size] for i in range(0, len(records), chunk_size)]
+    results = []
+    for chunk_results in worker_pool(workers).map(replay_games, chunks):
+        results.extend(chunk_results)
+    return results
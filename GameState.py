@@ -1,118 +1,462 @@
+import random
+from enum import IntEnum
+
+
+class Role(IntEnum):
+    UNKNOWN = 0
+    LIBERAL = 1
+    FASCIST = 2
+    HITLER = 3
+
+
+class Policy(IntEnum):
+    LIBERAL = 0
+    FASCIST = 1
+
+
+class Phase(IntEnum):
+    # Each phase is a decision point; legal_action_mask depends on it
+    NOMINATION = 0
+    VOTE = 1
+    DISCARD = 2
+    ENACT = 3
+    INVESTIGATE = 4
+    SPECIAL_ELECTION = 5
+    KILL = 6
+    GAME_OVER = 7
+
+
+ROLE_NAMES = ('Unknown', 'Liberal', 'Fascist', 'Hitler')
+ROLE_CODES = {name: Role(code) for code, name in enumerate(ROLE_NAMES)}
+POLICY_NAMES = ('Liberal', 'Fascist')
+POLICY_CODES = {name: Policy(code) for code, name in enumerate(POLICY_NAMES)}
+
+TOTAL_LIBERAL_POLICIES = 6
+TOTAL_FASCIST_POLICIES = 11
+
+# Rewards of GameState.calculate_reward and RewardPipeline
+WIN_REWARD = 100
+ENACT_REWARD = 10
+ILLEGAL_ACTION_PENALTY = 20
+
+# GameState keeps every per-player array in one bytearray, one section per field
+ROLES = 0
+ALIVE = 1
+ELIGIBLE = 2
+INVESTIGATED = 3
+PLAYER_FIELDS = 4
+
+
+# Zobrist keys: one random 64-bit key per value of every hashed part of the state.
+# The hash of a state is the XOR of the keys of its current values, so changing one
+# value costs two XORs.
+MAX_PLAYERS = 10
+BYTE_VALUES = 4  # player_data bytes range over Role codes (0-3) or 0/1
+_key_rng = random.Random(0x5ECE7)
+
+
+def _zobrist_keys(count):
+    return [_key_rng.getrandbits(64) for _ in range(count)]
+
+
+PLAYER_DATA_KEYS = _zobrist_keys(PLAYER_FIELDS * MAX_PLAYERS * BYTE_VALUES)  # Indexed by byte index * 4 + value
+LIBERAL_POLICY_KEYS = _zobrist_keys(TOTAL_LIBERAL_POLICIES + 1)
+FASCIST_POLICY_KEYS = _zobrist_keys(TOTAL_FASCIST_POLICIES + 1)
+TRACKER_KEYS = _zobrist_keys(3)
+VETO_KEY = _zobrist_keys(1)[0]
+PHASE_KEYS = _zobrist_keys(len(Phase))
+PRESIDENT_KEYS = _zobrist_keys(MAX_PLAYERS + 1)  # Indexed by player id + 1, 0 when there is none
+CHANCELLOR_KEYS = _zobrist_keys(MAX_PLAYERS + 1)
+HAND_KEYS = _zobrist_keys(4 * 4)  # Indexed by hand_liberal * 4 + hand_fascist
+
+
+# Every game starts from the same state, so its hash is computed once per player count
+_initial_hashes = {}
+
+
+def _seat(player_id):
+    return 0 if player_id is None else player_id + 1
+
+
+def role_code(role):
+    return ROLE_CODES[role] if isinstance(role, str) else Role(role)
+
+
+def policy_code(policy):
+    return POLICY_CODES[policy] if isinstance(policy, str) else Policy(policy)
+
+
+class HistoryLog:
+    """
+    Append-only log stored as a persistent linked list. append() returns a new log
+    that shares every earlier entry, so copying a log is free and clones of a
+    GameState never pay for the history they have in common.
+    """
+    __slots__ = ('node', 'length')
+
+    def __init__(self, node=None, length=0):
+        self.node = node  # Tuple of (entry, previous node), or None when empty
+        self.length = length
+
+    def append(self, entry):
+        return HistoryLog((entry, self.node), self.length + 1)
+
+    def last(self):
+        return self.node[0] if self.node else None
+
+    def __len__(self):
+        return self.length
+
+    def __iter__(self):
+        return iter(self.to_list())
+
+    def to_list(self):
+        # Walk back from the newest entry, then return the entries oldest first
+        entries = []
+        node = self.node
+        while node:
+            entries.append(node[0])
+            node = node[1]
+        entries.reverse()
+        return entries
+
+
+EMPTY_LOG = HistoryLog()
+
+
 class GameState:
+    __slots__ = (
+        'num_players', 'player_data', 'enacted_liberal_policies', 'enacted_fascist_policies',
+        'failed_elections_count', 'veto_power_active', 'special_election_called',
+        'known_liberal_policies', 'known_fascist_policies', 'current_president', 'current_chancellor',
+        'last_government', 'government_log', 'action_log', 'interaction_log',
+        'game_ended', 'winner', 'ai_player_id',
+        'phase', 'presidential_candidate', 'nominated_chancellor', 'hand_liberal', 'hand_fascist',
+        'observers', 'zobrist',
+    )
+
     def __init__(self, num_players):
         self.num_players = num_players
-        self.player_roles = ['Unknown'] * num_players  # Roles are hidden except for the AI itself
+        self.player_data = bytearray(num_players * PLAYER_FIELDS)
+        self.reset()
+
+    def reset(self):
+        """
+        Return to the start of a game in place, keeping player_data's buffer.
+        """
+        num_players = self.num_players
+        # Roles are hidden except for the AI itself; every player starts alive and eligible
+        self.player_data[:] = bytes(num_players * PLAYER_FIELDS)
+        self.player_data[ALIVE * num_players:(ELIGIBLE + 1) * num_players] = b'\x01' * (2 * num_players)
         self.enacted_liberal_policies = 0
         self.enacted_fascist_policies = 0
         self.failed_elections_count = 0
-        self.previous_governments = []  # List of tuples (president, chancellor)
-        self.alive_players = [True] * num_players
         self.veto_power_active = False
-        self.known_policy_deck = {'Liberal': 6, 'Fascist': 11}  # Initial known policy deck composition
-        self.investigation_results = {}  # Dict of player id to 'Liberal' or 'Fascist' if investigated
         self.special_election_called = False
-        self.chancellor_eligibility = [True] * num_players
-        self.player_actions = []  # List of player actions, can be extended with more details
-        self.player_interactions = []  # List of interactions between players
+        self.known_liberal_policies = TOTAL_LIBERAL_POLICIES  # Initial known policy deck composition
+        self.known_fascist_policies = TOTAL_FASCIST_POLICIES
         self.current_president = None
         self.current_chancellor = None
         self.last_government = (None, None)
+        self.government_log = EMPTY_LOG  # Entries are (president, chancellor, election_succeeded)
+        self.action_log = EMPTY_LOG  # Entries are (player_id, action)
+        self.interaction_log = EMPTY_LOG  # Entries are (player1_id, player2_id, interaction_type)
+        self.game_ended = False
+        self.winner = None  # 'Liberals' or 'Fascists' once the game has ended
+        self.ai_player_id = None  # The player whose point of view this state holds, if any
+        self.phase = Phase.NOMINATION
+        self.presidential_candidate = None
+        self.nominated_chancellor = None
+        self.hand_liberal = 0  # Policies held by the President or Chancellor during a legislative session
+        self.hand_fascist = 0
+        self.observers = ()  # Objects told about every update_after_* and player_killed call, e.g. a BeliefTracker
+        # Kept up to date by every update method
+        self.zobrist = _initial_hashes.get(num_players)
+        if self.zobrist is None:
+            self.zobrist = _initial_hashes[num_players] = self.compute_hash()
+
+    def clone(self):
+        """
+        Copy this state. The per-player arrays are a single small bytearray and the
+        history logs are shared, so the cost does not grow with the length of the game.
+        """
+        state = GameState.__new__(GameState)
+        state.num_players = self.num_players
+        state.player_data = bytearray(self.player_data)
+        state.enacted_liberal_policies = self.enacted_liberal_policies
+        state.enacted_fascist_policies = self.enacted_fascist_policies
+        state.failed_elections_count = self.failed_elections_count
+        state.veto_power_active = self.veto_power_active
+        state.special_election_called = self.special_election_called
+        state.known_liberal_policies = self.known_liberal_policies
+        state.known_fascist_policies = self.known_fascist_policies
+        state.current_president = self.current_president
+        state.current_chancellor = self.current_chancellor
+        state.last_government = self.last_government
+        state.government_log = self.government_log
+        state.action_log = self.action_log
+        state.interaction_log = self.interaction_log
+        state.game_ended = self.game_ended
+        state.winner = self.winner
+        state.ai_player_id = self.ai_player_id
+        state.phase = self.phase
+        state.presidential_candidate = self.presidential_candidate
+        state.nominated_chancellor = self.nominated_chancellor
+        state.hand_liberal = self.hand_liberal
+        state.hand_fascist = self.hand_fascist
+        state.observers = ()  # Copies are not watched
+        state.zobrist = self.zobrist
+        return state
+
+    # A snapshot is a clone that the caller promises not to modify
+    snapshot = clone
+
+    def _field(self, field):
+        start = field * self.num_players
+        return self.player_data[start:start + self.num_players]
+
+    # Per-player lookups that don't build lists
+
+    def role_of(self, player_id):
+        return Role(self.player_data[ROLES * self.num_players + player_id])
+
+    def is_player_alive(self, player_id):
+        return self.player_data[ALIVE * self.num_players + player_id] == 1
+
+    def is_eligible_for_chancellor(self, player_id):
+        return self.player_data[ELIGIBLE * self.num_players + player_id] == 1
+
+    def investigation_result(self, player_id):
+        return Role(self.player_data[INVESTIGATED * self.num_players + player_id])
+
+    # List and dict views matching the original attribute layout
+
+    @property
+    def player_roles(self):
+        return [ROLE_NAMES[code] for code in self._field(ROLES)]
+
+    @property
+    def alive_players(self):
+        return [code == 1 for code in self._field(ALIVE)]
+
+    @property
+    def chancellor_eligibility(self):
+        return [code == 1 for code in self._field(ELIGIBLE)]
+
+    @property
+    def investigation_results(self):
+        return {player_id: ROLE_NAMES[code] for player_id, code in enumerate(self._field(INVESTIGATED)) if code}
+
+    @property
+    def known_policy_deck(self):
+        return {'Liberal': self.known_liberal_policies, 'Fascist': self.known_fascist_policies}
+
+    @property
+    def previous_governments(self):
+        return self.government_log.to_list()
+
+    @property
+    def player_actions(self):
+        return self.action_log.to_list()
+
+    @property
+    def player_interactions(self):
+        return self.interaction_log.to_list()
+
+    def alive_count(self):
+        start = ALIVE * self.num_players
+        return self.num_players - self.player_data.count(0, start, start + self.num_players)
+
+    def compute_hash(self):
+        """
+        64-bit Zobrist hash of the compact state (player_data, enacted policies, the
+        election tracker, veto power, phase, candidates and legislative hand), from
+        scratch. The history logs are not part of it. zobrist always holds the same
+        value, updated incrementally.
+        """
+        value = 0
+        for index, byte in enumerate(self.player_data):
+            value ^= PLAYER_DATA_KEYS[index * BYTE_VALUES + byte]
+        value ^= LIBERAL_POLICY_KEYS[self.enacted_liberal_policies] ^ FASCIST_POLICY_KEYS[self.enacted_fascist_policies]
+        value ^= TRACKER_KEYS[self.failed_elections_count % 3]
+        if self.veto_power_active:
+            value ^= VETO_KEY
+        value ^= PHASE_KEYS[self.phase]
+        value ^= PRESIDENT_KEYS[_seat(self.presidential_candidate)] ^ CHANCELLOR_KEYS[_seat(self.nominated_chancellor)]
+        value ^= HAND_KEYS[self.hand_liberal * 4 + self.hand_fascist]
+        return value
+
+    def _set_player_byte(self, index, value):
+        old = self.player_data[index]
+        if old != value:
+            self.zobrist ^= PLAYER_DATA_KEYS[index * BYTE_VALUES + old] ^ PLAYER_DATA_KEYS[index * BYTE_VALUES + value]
+            self.player_data[index] = value
+
+    def update_phase(self, phase):
+        self.zobrist ^= PHASE_KEYS[self.phase] ^ PHASE_KEYS[phase]
+        self.phase = phase
+
+    def update_nomination(self, president_id, chancellor_id=None):
+        # The candidates currently up for election, who also run the legislative session
+        self.zobrist ^= (PRESIDENT_KEYS[_seat(self.presidential_candidate)] ^ PRESIDENT_KEYS[_seat(president_id)]
+                         ^ CHANCELLOR_KEYS[_seat(self.nominated_chancellor)] ^ CHANCELLOR_KEYS[_seat(chancellor_id)])
+        self.presidential_candidate = president_id
+        self.nominated_chancellor = chancellor_id
+        self.update_phase(Phase.NOMINATION if chancellor_id is None else Phase.VOTE)
+
+    def update_legislative_hand(self, policies, phase):
+        # policies is the hand of the President (DISCARD) or Chancellor (ENACT)
+        self.zobrist ^= HAND_KEYS[self.hand_liberal * 4 + self.hand_fascist]
+        self.hand_liberal = policies.count('Liberal')
+        self.hand_fascist = len(policies) - self.hand_liberal
+        self.zobrist ^= HAND_KEYS[self.hand_liberal * 4 + self.hand_fascist]
+        self.update_phase(phase)
+
+    def hide_investigations(self, known):
+        """
+        Forget the investigation result of every player not in known: only the
+        President who investigated a player learns their party.
+        """
+        start = INVESTIGATED * self.num_players
+        for player_id in range(self.num_players):
+            if player_id not in known:
+                self._set_player_byte(start + player_id, Role.UNKNOWN)
 
     def update_roles(self, ai_player_id, ai_role):
         # AI knows its own role
-        self.player_roles[ai_player_id] = ai_role
+        self._set_player_byte(ROLES * self.num_players + ai_player_id, role_code(ai_role))
+
+    def add_observer(self, observer):
+        self.observers += (observer,)
 
     def update_after_election(self, president_id, chancellor_id, election_succeeded):
-        self.previous_governments.append((president_id, chancellor_id, election_succeeded))
+        self.government_log = self.government_log.append((president_id, chancellor_id, election_succeeded))
         self.last_government = (president_id, chancellor_id)
+        self.zobrist ^= TRACKER_KEYS[self.failed_elections_count % 3]
         if not election_succeeded:
             self.failed_elections_count += 1
+            self.zobrist ^= TRACKER_KEYS[self.failed_elections_count % 3]
         else:
             # Reset failed election count after a successful election
             self.failed_elections_count = 0
+            self.zobrist ^= TRACKER_KEYS[0]
             # Update current government
             self.current_president = president_id
             self.current_chancellor = chancellor_id
-            # Update eligibility for chancellorship
-            self.chancellor_eligibility = [i not in self.last_government for i in range(self.num_players)]
+            # Update eligibility for chancellorship; with five or fewer players alive
+            # only the last Chancellor is term-limited
+            start = ELIGIBLE * self.num_players
+            data, keys, zobrist = self.player_data, PLAYER_DATA_KEYS, self.zobrist
+            limited_president = president_id if self.alive_count() > 5 else chancellor_id
+            for index in range(start, start + self.num_players):
+                eligible = 0 if index - start == chancellor_id or index - start == limited_president else 1
+                if data[index] != eligible:
+                    zobrist ^= keys[index * BYTE_VALUES + data[index]] ^ keys[index * BYTE_VALUES + eligible]
+                    data[index] = eligible
+            self.zobrist = zobrist
+        for observer in self.observers:
+            observer.update_after_election(self, president_id, chancellor_id, election_succeeded)
 
-    def update_after_legislation(self, policy_type):
-        if policy_type == 'Liberal':
+    def count_enacted_policy(self, policy_type):
+        policy = policy_code(policy_type)
+        if policy == Policy.LIBERAL:
+            self.zobrist ^= LIBERAL_POLICY_KEYS[self.enacted_liberal_policies]
             self.enacted_liberal_policies += 1
-            self.known_policy_deck['Liberal'] -= 1
-        elif policy_type == 'Fascist':
+            self.known_liberal_policies -= 1
+            self.zobrist ^= LIBERAL_POLICY_KEYS[self.enacted_liberal_policies]
+        elif policy == Policy.FASCIST:
+            self.zobrist ^= FASCIST_POLICY_KEYS[self.enacted_fascist_policies]
             self.enacted_fascist_policies += 1
-            self.known_policy_deck['Fascist'] -= 1
+            self.known_fascist_policies -= 1
+            self.zobrist ^= FASCIST_POLICY_KEYS[self.enacted_fascist_policies]
+
+    def update_after_legislation(self, policy_type):
+        self.count_enacted_policy(policy_type)
+        # The session is over, so nobody holds a hand any more
+        self.zobrist ^= HAND_KEYS[self.hand_liberal * 4 + self.hand_fascist] ^ HAND_KEYS[0]
+        self.hand_liberal = 0
+        self.hand_fascist = 0
         # Consider reshuffling if the policy deck is empty
+        for observer in self.observers:
+            observer.update_after_legislation(self, policy_type)
+
+    def update_after_top_deck(self, policy_type):
+        # A policy enacted from the top of the deck after three failed elections
+        self.count_enacted_policy(policy_type)
+        for observer in self.observers:
+            observer.update_after_top_deck(self, policy_type)
 
     def update_after_investigation(self, investigator_id, investigated_id, party_membership):
-        self.investigation_results[investigated_id] = party_membership
+        if party_membership is None:
+            return
+        self._set_player_byte(INVESTIGATED * self.num_players + investigated_id, role_code(party_membership))
+        for observer in self.observers:
+            observer.update_after_investigation(self, investigator_id, investigated_id, party_membership)
 
     def update_after_special_election(self, special_president_id):
         self.special_election_called = True
         self.current_president = special_president_id
 
     def update_veto_power(self, veto_power_state):
+        if bool(veto_power_state) != bool(self.veto_power_active):
+            self.zobrist ^= VETO_KEY
         self.veto_power_active = veto_power_state
 
     def player_killed(self, player_id):
-        self.alive_players[player_id] = False
+        self._set_player_byte(ALIVE * self.num_players + player_id, 0)
+        for observer in self.observers:
+            observer.player_killed(self, player_id)
 
     def update_policy_deck(self, liberal_count, fascist_count):
-        self.known_policy_deck['Liberal'] = liberal_count
-        self.known_policy_deck['Fascist'] = fascist_count
+        self.known_liberal_policies = liberal_count
+        self.known_fascist_policies = fascist_count
 
     def reshuffle_policy_deck(self):
         # Typically the exact composition of the policy deck is unknown
         # but we can reset the count based on total policies minus enacted ones
-        total_liberal_policies = 6
-        total_fascist_policies = 11
-        self.known_policy_deck['Liberal'] = total_liberal_policies - self.enacted_liberal_policies
-        self.known_policy_deck['Fascist'] = total_fascist_policies - self.enacted_fascist_policies
+        self.known_liberal_policies = TOTAL_LIBERAL_POLICIES - self.enacted_liberal_policies
+        self.known_fascist_policies = TOTAL_FASCIST_POLICIES - self.enacted_fascist_policies
+
+    def update_after_game_end(self, winner):
+        self.game_ended = True
+        self.winner = winner
+        self.update_phase(Phase.GAME_OVER)
 
     def add_player_action(self, player_id, action):
-        self.player_actions.append((player_id, action))
+        self.action_log = self.action_log.append((player_id, action))
 
     def add_player_interaction(self, player1_id, player2_id, interaction_type):
-        self.player_interactions.append((player1_id, player2_id, interaction_type))
+        self.interaction_log = self.interaction_log.append((player1_id, player2_id, interaction_type))
 
-    def calculate_reward(previous_state, current_state, action, outcome):
+    @staticmethod
+    def calculate_reward(previous_state, current_state, action, outcome, legal=None):
         """
         Calculate the reward for an action taken by the AI player based on the outcome.
+        RewardPipeline computes the same rewards for whole recorded batches at once.
 
         :param previous_state: GameState object before the action was taken
-        :param current_state: GameState object after the action was taken
+        :param current_state: GameState object after the action was taken, seen by the AI player
         :param action: The action that was taken by the AI player
         :param outcome: The outcome of the action (e.g., whether it succeeded)
+        :param legal: Whether the action was legal, if known; otherwise only investigating
+            a dead player counts as illegal
         :return: The numerical reward for the action taken
         """
         reward = 0
+        fascist = current_state.role_of(current_state.ai_player_id) >= Role.FASCIST
 
-        # Assign a large positive reward for winning the game
-        if current_state.game_ended and current_state.winner == 'Liberals' and current_state.player_roles[current_state.ai_player_id] == 'Liberal':
-            reward += 100
-        elif current_state.game_ended and current_state.winner == 'Fascists' and (current_state.player_roles[current_state.ai_player_id] == 'Fascist' or current_state.player_roles[current_state.ai_player_id] == 'Hitler'):
-            reward += 100
+        # Win or lose the game with your team
+        if current_state.game_ended:
+            reward += WIN_REWARD if (current_state.winner == 'Fascists') == fascist else -WIN_REWARD
 
-        # Assign a large negative reward for losing the game
-        if current_state.game_ended and current_state.winner != 'Liberals' and current_state.player_roles[current_state.ai_player_id] == 'Liberal':
-            reward -= 100
-        elif current_state.game_ended and current_state.winner != 'Fascists' and (current_state.player_roles[current_state.ai_player_id] == 'Fascist' or current_state.player_roles[current_state.ai_player_id] == 'Hitler'):
-            reward -= 100
-
-        # Assign intermediate rewards or penalties based on actions taken
+        # Enacting a policy of your own faction is rewarded, the other faction's punished
         if action[0] == 'Enact' and outcome:
-            # Positive reward for enacting a policy of your own faction
-            if (action[1] == 'Liberal' and current_state.player_roles[current_state.ai_player_id] == 'Liberal') or \
-                    (action[1] == 'Fascist' and (current_state.player_roles[current_state.ai_player_id] == 'Fascist' or current_state.player_roles[current_state.ai_player_id] == 'Hitler')):
-                reward += 10
-            else:
-                reward -= 10
-
-        # Punish the AI for picking actions that are not sensible, like investigating a dead player
-        if action[0] == 'Investigate' and not previous_state.alive_players[action[1]]:
-            reward -= 20
-
-        # Additional rules can be added based on the intricacies of the game
+            reward += ENACT_REWARD if (action[1] == 'Fascist') == fascist else -ENACT_REWARD
+
+        # Punish actions that are not sensible, like investigating a dead player
+        if legal is None:
+            legal = action[0] != 'Investigate' or previous_state.is_player_alive(action[1])
+        if not legal:
+            reward -= ILLEGAL_ACTION_PENALTY
 
         return reward
@@ -0,0 +1,93 @@
+import argparse
+
+from EventLog import SILENT_LOG
+from Player import Player
+from SecretHitlerGame import SecretHitlerGame
+from SimulationRunner import game_seeds
+
+
+class HashChecker:
+    """
+    GameState observer that compares the incremental hash with one computed from
+    scratch after every event it hears about.
+    """
+
+    def __init__(self):
+        self.checks = 0
+        self.mismatches = []
+
+    def check(self, game_state, event):
+        self.checks += 1
+        if game_state.zobrist != game_state.compute_hash():
+            self.mismatches.append((event, game_state.phase))
+
+    def update_after_election(self, game_state, president_id, chancellor_id, election_succeeded):
+        self.check(game_state, 'election')
+
+    def update_after_legislation(self, game_state, policy_type):
+        self.check(game_state, 'legislation')
+
+    def update_after_top_deck(self, game_state, policy_type):
+        self.check(game_state, 'top_deck')
+
+    def update_after_investigation(self, game_state, investigator_id, investigated_id, party_membership):
+        self.check(game_state, 'investigation')
+
+    def player_killed(self, game_state, player_id):
+        self.check(game_state, 'killed')
+
+
+def verify_incremental_hash(num_games=1000, num_players=7, seed=0):
+    """
+    Play num_games random games and check that GameState.zobrist matches
+    GameState.compute_hash() after every event, at every decision, in every
+    player's view and at the end of the game. Returns (checks, mismatches).
+    """
+    checker = HashChecker()
+
+    class CheckingPlayer(Player):
+        # Every decision point follows an update_nomination or update_legislative_hand call
+        def vote(self, president, chancellor):
+            checker.check(self.game_state, 'vote')
+            view = self.game_state.clone()
+            view.update_roles(self.player_id, self.role)
+            checker.check(view, 'player_view')
+            return super().vote(president, chancellor)
+
+        def discard_policy(self, drawn_policies):
+            checker.check(self.game_state, 'discard')
+            return super().discard_policy(drawn_policies)
+
+        def enact_policy(self, remaining_policies):
+            checker.check(self.game_state, 'enact')
+            return super().enact_policy(remaining_policies)
+
+    for game_seed in game_seeds(num_games, seed):
+        game = SecretHitlerGame(num_players, seed=game_seed, log=SILENT_LOG, player_factory=CheckingPlayer)
+        game.state.add_observer(checker)
+        game.state.update_veto_power(True)
+        checker.check(game.state, 'veto_power')
+        game.state.update_veto_power(False)
+        game.start_game()
+        checker.check(game.state, 'game_over')
+    return checker.checks, checker.mismatches
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Check GameState's incremental hash against a full recomputation.")
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--players', type=int, nargs='+', default=[5, 7, 10])
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+    failed = False
+    for num_players in args.players:
+        checks, mismatches = verify_incremental_hash(args.games, num_players, args.seed)
+        print(f"{num_players} players: {checks} checks, {len(mismatches)} mismatches")
+        if mismatches:
+            print(f"  first mismatch after: {mismatches[0]}")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
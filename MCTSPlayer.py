@@ -0,0 +1,327 @@
+import math
+import random
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from ActionSpace import action_space_for
+from BeliefTracker import BeliefTracker, role_assignments
+from GameState import ROLE_NAMES, Phase
+from Player import Player
+from PolicyDeckTracker import HAND_SIZE, PolicyDeckTracker, draw_distribution
+from SecretHitlerGame import SecretHitlerGame
+
+
+def information_set_key(game_state):
+    """
+    Hash of everything a player knows at a decision point: the public state plus
+    their own role, which a player's view of the state holds. This is the state's
+    incrementally maintained Zobrist hash, so it costs nothing to compute.
+    """
+    return game_state.zobrist
+
+
+class TranspositionTable:
+    """
+    Search statistics per information set, holding at most max_entries of them.
+    The least recently used entry is evicted when it is full.
+
+    An entry maps each action to [visits, total reward, times available].
+    """
+
+    def __init__(self, max_entries=100000):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.evictions = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def create(self, key):
+        entry = self.entries[key] = {}
+        if len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.evictions += 1
+        return entry
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class SearchRoot:
+    """
+    What the searching player knows at the decision being searched, in a form
+    that can be sent to worker processes.
+    """
+
+    def __init__(self, player, beliefs, deck):
+        self.game_state = player.game_state.clone()
+        self.game_state.update_roles(player.player_id, player.role)
+        self.game_state.ai_player_id = player.player_id
+        self.player_id = player.player_id
+        self.role = player.role
+        self.investigated_players = set(player.investigated_players)
+        self.belief_weights = beliefs.weights
+        self.deck_size = deck.deck_size
+        self.deck_liberal = deck.deck_liberal
+        self.liberal_unseen = deck.liberal_unseen
+        self.fascist_unseen = deck.fascist_unseen
+
+
+def sample_roles(root, rng):
+    assignments = role_assignments(root.game_state.num_players)
+    cumulative = np.cumsum(root.belief_weights)
+    index = int(np.searchsorted(cumulative, rng.random() * cumulative[-1], side='right'))
+    return [ROLE_NAMES[code] for code in assignments[min(index, len(assignments) - 1)]]
+
+
+def sample_deck(root, rng):
+    """
+    A deck and discard pile consistent with what the searching player knows,
+    including the legislative hand when it is in play.
+    """
+    state = root.game_state
+    hand_size = state.hand_liberal + state.hand_fascist if state.phase in (Phase.DISCARD, Phase.ENACT) else 0
+    deck_size, deck_liberal = root.deck_size, root.deck_liberal
+    if hand_size:
+        # The deck tracker hears about a session only once it is over, so draw the
+        # hand out of its distribution, reshuffling first as the game did
+        if deck_size < HAND_SIZE:
+            deck_size = root.liberal_unseen + root.fascist_unseen
+            deck_liberal = np.zeros_like(deck_liberal)
+            deck_liberal[root.liberal_unseen] = 1.0
+        weights = {}
+        for liberal in np.flatnonzero(deck_liberal):
+            hands = draw_distribution(int(liberal), deck_size - int(liberal))
+            # A Chancellor holding two cards doesn't know which one was discarded
+            for drawn_liberal in range(state.hand_liberal, state.hand_liberal + HAND_SIZE - hand_size + 1):
+                if hands[drawn_liberal]:
+                    weights[(int(liberal), drawn_liberal)] = deck_liberal[liberal] * hands[drawn_liberal]
+        outcomes = list(weights)
+        liberal, drawn_liberal = rng.choices(outcomes, [weights[outcome] for outcome in outcomes])[0]
+        liberal -= drawn_liberal
+        deck_size -= HAND_SIZE
+    else:
+        liberal = rng.choices(range(len(deck_liberal)), deck_liberal)[0]
+
+    policy_deck = ['Liberal'] * liberal + ['Fascist'] * (deck_size - liberal)
+    rng.shuffle(policy_deck)
+    discarded_liberal = root.liberal_unseen - liberal - state.hand_liberal * (hand_size > 0)
+    discarded_fascist = root.fascist_unseen - (deck_size - liberal) - state.hand_fascist * (hand_size > 0)
+    return policy_deck, ['Liberal'] * discarded_liberal + ['Fascist'] * discarded_fascist
+
+
+class InformationSetSearch:
+    """
+    Single-observer information-set MCTS. Every iteration samples the hidden
+    information (roles from the BeliefTracker weights, deck from the deck
+    tracker), rebuilds the game with SecretHitlerGame.from_state and plays it to
+    the end. The searching player's decisions follow UCB over the statistics of
+    their information sets, adding one new information set per iteration; every
+    other decision is random.
+    """
+
+    def __init__(self, table=None, exploration=0.7, rng=None):
+        self.table = table if table is not None else TranspositionTable()
+        self.exploration = exploration
+        self.rng = rng if rng is not None else random.Random()
+        self.path = []
+        self.expanded = False
+
+    def run(self, root, iterations=None, time_budget=None):
+        """
+        Search from root until iterations or time_budget seconds run out, and
+        return the root statistics {action: [visits, total reward, available]}.
+        """
+        deadline = time.perf_counter() + time_budget if time_budget is not None else None
+        legal_actions = action_space_for(root.game_state.num_players).legal_actions(root.game_state, root.player_id)
+        root_key = information_set_key(root.game_state)
+        stats = self.table.get(root_key)
+        if stats is None:
+            stats = self.table.create(root_key)
+        if len(legal_actions) == 1:
+            return {legal_actions[0]: stats.setdefault(legal_actions[0], [0, 0.0, 0])}
+
+        done = 0
+        while (iterations is None or done < iterations) and (deadline is None or time.perf_counter() < deadline):
+            self.iterate(root, legal_actions, stats)
+            done += 1
+        return {action: stats[action] for action in legal_actions if action in stats}
+
+    def iterate(self, root, legal_actions, root_stats):
+        self.path = []
+        self.expanded = False
+        roles = sample_roles(root, self.rng)
+        policy_deck, discarded_policies = sample_deck(root, self.rng)
+
+        def seat(player_id, rng):
+            if player_id == root.player_id:
+                return TreePolicyPlayer(player_id, self, rng=rng)
+            return Player(player_id, rng=rng)
+
+        game = SecretHitlerGame.from_state(root.game_state, roles, policy_deck, discarded_policies,
+                                           seed=self.rng.getrandbits(64), player_factory=seat)
+        game.players[root.player_id].investigated_players.update(root.investigated_players)
+        action = self.select(root_stats, legal_actions)
+        game_data = game.resume(root.player_id, action)
+
+        liberal = roles[root.player_id] == 'Liberal'
+        reward = 1.0 if (game_data['winner'] == 'Liberals') == liberal else 0.0
+        for action_stats in self.path:
+            action_stats[0] += 1
+            action_stats[1] += reward
+
+    def select(self, stats, legal_actions):
+        """
+        Pick among legal_actions by UCB, where an action's exploration term grows
+        with the number of times it was available rather than the parent's visits.
+        """
+        best_action, best_score = None, -1.0
+        unvisited = []
+        for action in legal_actions:
+            action_stats = stats.get(action)
+            if action_stats is None:
+                action_stats = stats[action] = [0, 0.0, 0]
+            action_stats[2] += 1
+            if action_stats[0] == 0:
+                unvisited.append(action)
+            elif not unvisited:
+                score = (action_stats[1] / action_stats[0]
+                         + self.exploration * math.sqrt(math.log(action_stats[2]) / action_stats[0]))
+                if score > best_score:
+                    best_action, best_score = action, score
+        if unvisited:
+            best_action = self.rng.choice(unvisited)
+        self.path.append(stats[best_action])
+        return best_action
+
+    def decide(self, game_state, player_id):
+        """
+        A decision of the searching player inside an iteration.
+        """
+        legal_actions = action_space_for(game_state.num_players).legal_actions(game_state, player_id)
+        key = information_set_key(game_state)
+        stats = self.table.get(key)
+        if stats is None:
+            if self.expanded:
+                return self.rng.choice(legal_actions)  # Past the tree, so play out at random
+            self.expanded = True
+            stats = self.table.create(key)
+        return self.select(stats, legal_actions)
+
+
+class TreePolicyPlayer(Player):
+    """
+    The searching player inside a search iteration, deciding through the search.
+    """
+
+    def __init__(self, player_id, search, rng=None):
+        super().__init__(player_id, rng=rng)
+        self.search = search
+
+    def uses_model(self):
+        return True
+
+    def make_decision(self, game_state):
+        return self.search.decide(game_state, self.player_id)
+
+
+_worker_search = None
+
+
+def search_worker(root, iterations, time_budget, seed, table_size, exploration):
+    """
+    Run one root-parallel search in a worker process. Each worker keeps its own
+    transposition table between decisions.
+    """
+    global _worker_search
+    if _worker_search is None or _worker_search.table.max_entries != table_size:
+        _worker_search = InformationSetSearch(TranspositionTable(table_size), exploration)
+    _worker_search.exploration = exploration
+    _worker_search.rng.seed(seed)
+    stats = _worker_search.run(root, iterations, time_budget)
+    return {action: (action_stats[0], action_stats[1]) for action, action_stats in stats.items()}
+
+
+class MCTSPlayer(Player):
+    """
+    A player that decides by information-set MCTS over SecretHitlerGame rollouts,
+    within time_budget seconds or iterations iterations per decision (whichever
+    runs out first). Its beliefs about roles and the deck come from a BeliefTracker
+    and a PolicyDeckTracker that follow the game's state.
+
+    With workers > 1, each decision runs one independent search per worker process
+    (root parallelisation) and the visit counts are summed. Call close() to shut
+    the workers down.
+
+        game = SecretHitlerGame(7, player_factory=lambda i, rng: MCTSPlayer(i, rng=rng) if i == 0 else Player(i, rng=rng))
+    """
+
+    def __init__(self, player_id, rng=None, time_budget=0.1, iterations=None, workers=1, table_size=100000,
+                 exploration=0.7):
+        self.beliefs = None
+        self.deck = None
+        super().__init__(player_id, rng=rng)
+        self.time_budget = time_budget
+        self.iterations = iterations
+        self.workers = workers
+        self.table_size = table_size
+        self.search = InformationSetSearch(TranspositionTable(table_size), exploration, random.Random(self.rng.random()))
+        self.executor = None
+        self.searches = 0
+
+    @property
+    def game_state(self):
+        return self._game_state
+
+    @game_state.setter
+    def game_state(self, game_state):
+        self._game_state = game_state
+        self.watch()
+
+    def reset(self, role, seed=None):
+        super().reset(role, seed)
+        self.watch()
+
+    def watch(self):
+        # Start following a new game, or the same GameState after it was reset
+        game_state = getattr(self, '_game_state', None)
+        if game_state is None or self.role is None:
+            return
+        self.beliefs = BeliefTracker(game_state.num_players, self.player_id, self.role)
+        self.deck = PolicyDeckTracker()
+        game_state.add_observer(self.beliefs)
+        game_state.add_observer(self.deck)
+
+    def uses_model(self):
+        return True
+
+    def make_decision(self, game_state):
+        root = SearchRoot(self, self.beliefs, self.deck)
+        self.searches += 1
+        if self.workers <= 1:
+            stats = self.search.run(root, self.iterations, self.time_budget)
+            totals = {action: (action_stats[0], action_stats[1]) for action, action_stats in stats.items()}
+        else:
+            if self.executor is None:
+                self.executor = ProcessPoolExecutor(max_workers=self.workers)
+            iterations = -(-self.iterations // self.workers) if self.iterations is not None else None
+            futures = [self.executor.submit(search_worker, root, iterations, self.time_budget, self.rng.getrandbits(64),
+                                            self.table_size, self.search.exploration) for _ in range(self.workers)]
+            totals = {}
+            for future in futures:
+                for action, (visits, reward) in future.result().items():
+                    previous = totals.get(action, (0, 0.0))
+                    totals[action] = (previous[0] + visits, previous[1] + reward)
+        # The most visited action is the most robust choice
+        return max(totals, key=lambda action: (totals[action][0], totals[action][1]))
+
+    def close(self):
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
@@ -1,10 +1,48 @@
-from SecretHitlerGame import SecretHitlerGame
+import argparse
 
+from EventLog import LEVELS, EventLog, JsonlSink
 
-def main():
-    game = SecretHitlerGame(7)
-    game.start_game()
+# The game modules are imported by the commands that need them, so that --help and
+# argument errors return straight away
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Play Secret Hitler games between AI players.")
+    parser.add_argument('--games', type=int, default=1, help="number of games to play (more than one runs a batch simulation)")
+    parser.add_argument('--players', type=int, default=7, help="number of players per game")
+    parser.add_argument('--seed', type=int, default=None, help="seed for reproducible runs")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes for batch simulations")
+    parser.add_argument('--record', default=None, metavar='PATH', help="record every decision of a batch simulation to PATH")
+    parser.add_argument('--log-level', choices=list(LEVELS), default='debug', help="how much of a single game to print")
+    parser.add_argument('--events', default=None, metavar='PATH', help="append the events of a single game to PATH as JSON lines")
+    parser.add_argument('--vectorized', action='store_true', help="play the batch in lockstep with the NumPy engine")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.games == 1:
+        log = EventLog(LEVELS[args.log_level])
+        if args.events:
+            log.add_sink(JsonlSink(args.events))
+        from SecretHitlerGame import SecretHitlerGame
+        game = SecretHitlerGame(args.players, seed=args.seed, log=log)
+        game.start_game()
+        for sink in log.sinks:
+            sink.close()
+        return
+
+    if args.vectorized:
+        from VectorizedSecretHitlerGame import VectorizedSecretHitlerGame
+        results = VectorizedSecretHitlerGame(args.games, num_players=args.players, seed=args.seed).start_games()
+        print(results.summary())
+        return
+
+    from SimulationRunner import run_simulations
+    results = run_simulations(args.games, num_players=args.players, seed=args.seed, workers=args.workers,
+                              record_path=args.record)
+    print(results.summary())
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
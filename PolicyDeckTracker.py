@@ -0,0 +1,185 @@
+from functools import lru_cache
+from math import factorial
+
+import numpy as np
+
+from GameState import TOTAL_FASCIST_POLICIES, TOTAL_LIBERAL_POLICIES, Policy, policy_code
+
+DECK_SIZE = TOTAL_LIBERAL_POLICIES + TOTAL_FASCIST_POLICIES
+HAND_SIZE = 3
+
+
+def combinations_count(n, k):
+    if k < 0 or k > n:
+        return 0
+    return factorial(n) // (factorial(k) * factorial(n - k))
+
+
+@lru_cache(maxsize=4096)
+def draw_distribution(liberal_remaining, fascist_remaining, draws=HAND_SIZE):
+    """
+    P(exactly j Liberal policies among the top draws cards) for j = 0..draws, for
+    a shuffled deck of liberal_remaining + fascist_remaining policies. Element 0
+    is P(all Fascist).
+    """
+    total = combinations_count(liberal_remaining + fascist_remaining, draws)
+    return tuple(combinations_count(liberal_remaining, j) * combinations_count(fascist_remaining, draws - j) / total
+                 for j in range(draws + 1))
+
+
+def uniform_enactment(drawn_liberal, enacted_liberal):
+    """
+    P(the enacted policy | a hand of drawn_liberal Liberal policies) when the
+    government enacts a uniformly random card of the hand, as random players do.
+    """
+    liberal = drawn_liberal / HAND_SIZE
+    return liberal if enacted_liberal else 1.0 - liberal
+
+
+class PolicyDeckTracker:
+    """
+    Exact probabilities for the contents of the policy deck, as known to someone
+    who sees which policies are enacted but not the cards that are discarded.
+
+    The deck plus the discard pile always hold every policy not enacted yet, so
+    the tracker only needs a distribution over how many Liberal policies are in
+    the deck: deck_liberal[k] = P(the deck holds k Liberal policies). A reshuffle
+    makes it certain again. Each legislative session draws three cards from it,
+    and the enacted policy rules out the hands that didn't contain it. A top-deck
+    after three failed elections reveals exactly one card.
+
+    Each possible hand is weighted by how likely it was to be drawn and by
+    enactment_likelihood(drawn_liberal, enacted_liberal), how likely a government
+    holding it was to enact the policy it did. The default, uniform_enactment,
+    models governments that pick a card at random; pass a different model for
+    players that favour their own party's policies.
+
+    The tracker mirrors the game's reshuffle rules, so it stays in step with the
+    deck as long as it is told about every session and top-deck. Attach it to a
+    GameState with add_observer(), or call legislative_session()/top_deck()
+    directly, passing the drawn hand if it was seen (e.g. by the President).
+    """
+
+    def __init__(self, enactment_likelihood=uniform_enactment):
+        self.enactment_likelihood = enactment_likelihood
+        self.deck_liberal = np.zeros(DECK_SIZE + 1)
+        self.reset()
+
+    def reset(self):
+        self.liberal_unseen = TOTAL_LIBERAL_POLICIES  # Policies in the deck or the discard pile
+        self.fascist_unseen = TOTAL_FASCIST_POLICIES
+        self.reshuffle()
+
+    def reshuffle(self):
+        self.deck_size = self.liberal_unseen + self.fascist_unseen
+        self.deck_liberal[:] = 0.0
+        self.deck_liberal[self.liberal_unseen] = 1.0
+        self.cached_draw = None
+        self.cached_top_deck = None
+
+    def legislative_session(self, enacted_policy, hand=None):
+        """
+        Account for a hand of three being drawn and enacted_policy enacted from it.
+        hand is the list of drawn policies if the caller saw it.
+        """
+        if self.deck_size < HAND_SIZE:
+            self.reshuffle()
+        enacted_liberal = policy_code(enacted_policy) == Policy.LIBERAL
+        hand_liberal = None if hand is None else sum(policy_code(policy) == Policy.LIBERAL for policy in hand)
+
+        deck_liberal = np.zeros_like(self.deck_liberal)
+        for liberal in np.flatnonzero(self.deck_liberal):
+            probability = self.deck_liberal[liberal]
+            hands = draw_distribution(int(liberal), self.deck_size - int(liberal))
+            for drawn_liberal, hand_probability in enumerate(hands):
+                if hand_liberal is not None and drawn_liberal != hand_liberal:
+                    continue
+                likelihood = self.enactment_likelihood(drawn_liberal, enacted_liberal)
+                if likelihood:
+                    deck_liberal[liberal - drawn_liberal] += probability * hand_probability * likelihood
+
+        self.deck_size -= HAND_SIZE
+        self.update(deck_liberal, enacted_liberal)
+
+    def top_deck(self, policy):
+        """
+        Account for the top policy being enacted after three failed elections.
+        """
+        if self.deck_size == 0:
+            self.reshuffle()
+        liberal = policy_code(policy) == Policy.LIBERAL
+        counts = np.arange(DECK_SIZE + 1)
+        deck_liberal = np.zeros_like(self.deck_liberal)
+        if liberal:
+            deck_liberal[:-1] = self.deck_liberal[1:] * counts[1:] / self.deck_size
+        else:
+            deck_liberal[:] = self.deck_liberal * np.maximum(self.deck_size - counts, 0) / self.deck_size
+
+        self.deck_size -= 1
+        self.update(deck_liberal, liberal)
+
+    def update(self, deck_liberal, enacted_liberal):
+        total = deck_liberal.sum()
+        if total > 0:
+            self.deck_liberal = deck_liberal / total
+        if enacted_liberal:
+            self.liberal_unseen -= 1
+        else:
+            self.fascist_unseen -= 1
+        self.cached_draw = None
+        self.cached_top_deck = None
+
+    # Queries, cached until the next update
+
+    def next_draw_probabilities(self):
+        """
+        P(j Liberal policies in the next legislative hand) for j = 0..3, after the
+        reshuffle the game would make first if the deck is short.
+        """
+        if self.cached_draw is None:
+            if self.deck_size < HAND_SIZE:
+                self.cached_draw = np.array(draw_distribution(self.liberal_unseen, self.fascist_unseen))
+            else:
+                self.cached_draw = np.zeros(HAND_SIZE + 1)
+                for liberal in np.flatnonzero(self.deck_liberal):
+                    self.cached_draw += (self.deck_liberal[liberal]
+                                         * np.array(draw_distribution(int(liberal), self.deck_size - int(liberal))))
+        return self.cached_draw
+
+    def three_fascist_probability(self):
+        return self.next_draw_probabilities()[0]
+
+    def top_deck_probabilities(self):
+        """
+        (P(Liberal), P(Fascist)) for the policy a top-deck would enact now.
+        """
+        if self.cached_top_deck is None:
+            if self.deck_size == 0:
+                liberal = self.liberal_unseen / (self.liberal_unseen + self.fascist_unseen)
+            else:
+                liberal = float(self.deck_liberal @ np.arange(DECK_SIZE + 1)) / self.deck_size
+            self.cached_top_deck = (liberal, 1.0 - liberal)
+        return self.cached_top_deck
+
+    def discard_liberal_probabilities(self):
+        """
+        P(the discard pile holds k Liberal policies) for k = 0..liberal_unseen.
+        """
+        return self.deck_liberal[self.liberal_unseen::-1].copy()
+
+    # GameState observer interface
+
+    def update_after_election(self, game_state, president_id, chancellor_id, election_succeeded):
+        pass
+
+    def update_after_legislation(self, game_state, policy_type):
+        self.legislative_session(policy_type)
+
+    def update_after_top_deck(self, game_state, policy_type):
+        self.top_deck(policy_type)
+
+    def update_after_investigation(self, game_state, investigator_id, investigated_id, party_membership):
+        pass
+
+    def player_killed(self, game_state, player_id):
+        pass
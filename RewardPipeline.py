@@ -0,0 +1,146 @@
+import numpy as np
+
+from ActionSpace import action_space_for
+from GameState import ENACT_REWARD, ILLEGAL_ACTION_PENALTY, WIN_REWARD, Role
+
+# Columns RewardPipeline reads; features are never needed
+REWARD_COLUMNS = ('game_id', 'player_id', 'role', 'legal_mask', 'action', 'done', 'won')
+
+
+class Segments:
+    """
+    Steps sorted into contiguous trajectories. order sorts the steps by trajectory
+    id, keeping the recorded order within a trajectory, and every per-step array
+    is processed in that order and scattered back at the end.
+    """
+
+    def __init__(self, trajectory_ids):
+        self.order = np.argsort(trajectory_ids, kind='stable')
+        ids = trajectory_ids[self.order]
+        size = len(ids)
+        self.starts = np.flatnonzero(np.concatenate(([True], ids[1:] != ids[:-1]))) if size else np.zeros(0, np.int64)
+        self.ends = np.append(self.starts[1:], size) if size else self.starts  # Exclusive
+        lengths = self.ends - self.starts
+        self.start_of_step = np.repeat(self.starts, lengths)
+        self.end_of_step = np.repeat(self.ends, lengths)
+        self.position = np.arange(size) - self.start_of_step  # Steps since the trajectory started
+        self.last = np.zeros(size, dtype=np.bool_)
+        self.last[self.ends - 1] = True
+
+    def discounted_sum(self, values, factor):
+        """
+        out[t] = sum over k >= t in t's trajectory of factor ** (k - t) * values[k],
+        for values in sorted order. Runs the recurrence out[t] = values[t] +
+        factor * out[t + 1] backwards one position at a time, for every trajectory
+        at once, so it loops only as many times as the longest trajectory is long.
+        """
+        out = np.array(values, dtype=np.float64)
+        if factor == 0 or not len(out):
+            return out
+        following = np.flatnonzero(~self.last)  # Steps with a next step in their trajectory
+        levels = self.position[following]
+        by_level = np.argsort(levels, kind='stable')
+        bounds = np.searchsorted(levels[by_level], np.arange(levels.max() + 2 if len(levels) else 1))
+        for level in range(len(bounds) - 2, -1, -1):
+            steps = following[by_level[bounds[level]:bounds[level + 1]]]
+            out[steps] += factor * out[steps + 1]
+        return out
+
+    def unsort(self, values):
+        out = np.empty_like(values)
+        out[self.order] = values
+        return out
+
+
+class RewardPipeline:
+    """
+    Rewards, discounted returns and GAE advantages for recorded trajectories
+    (TrajectoryRecorder columns), a whole batch of steps at a time:
+
+      terminal     +win_reward when the player's team won, -win_reward when it lost
+      enactment    +enact_reward for enacting a policy of the player's faction, -enact_reward otherwise
+      illegal      -illegal_action_penalty for an action outside the step's legal_mask
+
+    which are the rewards of GameState.calculate_reward. A trajectory is one
+    player's steps in one game; they may be interleaved with other trajectories
+    in the batch but must be in recorded order, and every trajectory must be
+    complete. Batches from TrajectoryDataset.iter_batches can split trajectories
+    at shard boundaries, so use process_dataset() for a whole dataset.
+
+        pipeline = RewardPipeline(7, gamma=0.99, gae_lambda=0.95)
+        result = pipeline.process_dataset(TrajectoryDataset(path), values=critic_values)
+        result['advantage'], result['return']
+    """
+
+    def __init__(self, num_players, gamma=0.99, gae_lambda=0.95, win_reward=WIN_REWARD, enact_reward=ENACT_REWARD,
+                 illegal_action_penalty=ILLEGAL_ACTION_PENALTY):
+        self.num_players = num_players
+        self.gamma = gamma
+        self.gae_lambda = gae_lambda
+        self.win_reward = win_reward
+        self.enact_reward = enact_reward
+        self.illegal_action_penalty = illegal_action_penalty
+        action_space = action_space_for(num_players)
+        self.enact_liberal = action_space.enact
+        self.enact_fascist = action_space.enact + 1
+
+    def rewards(self, batch):
+        """
+        Per-step rewards (float32) from the role, action, legal_mask, done and won columns.
+        """
+        action = np.asarray(batch['action'], dtype=np.int64)
+        fascist = np.asarray(batch['role']) >= Role.FASCIST
+        done = np.asarray(batch['done'], dtype=np.bool_)
+        won = np.asarray(batch['won'], dtype=np.bool_)
+
+        rewards = np.where(done, np.where(won, self.win_reward, -self.win_reward), 0).astype(np.float32)
+        enacted = (action == self.enact_liberal) | (action == self.enact_fascist)
+        aligned = (action == self.enact_fascist) == fascist
+        rewards += np.where(enacted, np.where(aligned, self.enact_reward, -self.enact_reward), 0)
+        legal = np.asarray(batch['legal_mask'])[np.arange(len(action)), action]
+        rewards -= np.where(legal, 0, self.illegal_action_penalty)
+        return rewards
+
+    def trajectory_ids(self, batch, part=None):
+        """
+        One id per (part, game, player). part tells apart games recorded under
+        different part_* directories, whose game ids overlap.
+        """
+        ids = np.asarray(batch['game_id'], dtype=np.int64) * self.num_players + np.asarray(batch['player_id'])
+        if part is not None:
+            ids = ids + (np.asarray(part, dtype=np.int64) << 40)
+        return ids
+
+    def process(self, batch, values=None, part=None):
+        """
+        Rewards, discounted returns and, given per-step value estimates, GAE
+        advantages for batch, in its row order. Returns a dict with 'reward' and
+        'return', plus 'advantage' and 'value_target' (advantage + value) when
+        values is given. The value after a trajectory's last step is 0, as every
+        trajectory ends with the game.
+        """
+        rewards = self.rewards(batch)
+        segments = Segments(self.trajectory_ids(batch, part))
+        sorted_rewards = rewards[segments.order].astype(np.float64)
+        result = {
+            'reward': rewards,
+            'return': segments.unsort(segments.discounted_sum(sorted_rewards, self.gamma).astype(np.float32)),
+        }
+        if values is not None:
+            sorted_values = np.asarray(values, dtype=np.float64)[segments.order]
+            next_values = np.append(sorted_values[1:], 0.0)
+            next_values[segments.last] = 0.0
+            deltas = sorted_rewards + self.gamma * next_values - sorted_values
+            advantages = segments.discounted_sum(deltas, self.gamma * self.gae_lambda)
+            result['advantage'] = segments.unsort(advantages.astype(np.float32))
+            result['value_target'] = segments.unsort((advantages + sorted_values).astype(np.float32))
+        return result
+
+    def process_dataset(self, dataset, values=None):
+        """
+        process() over every step of a TrajectoryDataset, in the order of its
+        shards. Only the small columns are read, never the features.
+        """
+        batch = {name: np.concatenate([shard[name] for shard in dataset.shards]) for name in REWARD_COLUMNS}
+        part = np.repeat(dataset.shard_parts, [len(shard['action']) for shard in dataset.shards])
+        return self.process(batch, values, part)
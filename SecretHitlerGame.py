@@ -1,11 +1,42 @@
 import random
 
-from GameState import GameState
+from EventLog import DEBUG, INFO, SILENT_LOG, WARNING, EventLog
+from GameState import GameState, Phase
 from Player import Player
 
+# Number of Liberals and Fascists (not counting Hitler) for each supported player count
+ROLE_DISTRIBUTION = {
+    5: (3, 1),
+    6: (4, 1),
+    7: (4, 2),
+    8: (5, 2),
+    9: (5, 3),
+    10: (6, 3),
+}
+
+POLICY_DECK = ('Liberal',) * 6 + ('Fascist',) * 11
+
+
+def shuffled_roles(num_players, rng):
+    """
+    The roles of a num_players game in seat order. Dealing is a new game's first
+    use of its RNG, so shuffled_roles(num_players, random.Random(seed)) are the
+    roles SecretHitlerGame(num_players, seed) deals.
+    """
+    num_liberals, num_fascists = ROLE_DISTRIBUTION[num_players]
+    roles = ['Liberal'] * num_liberals + ['Fascist'] * num_fascists + ['Hitler']
+    rng.shuffle(roles)
+    return roles
+
 
 class SecretHitlerGame:
-    def __init__(self, num_players=7):
+    def __init__(self, num_players=7, seed=None, recorder=None, log=None, metrics=None, player_factory=Player):
+        if num_players not in ROLE_DISTRIBUTION:
+            raise ValueError(f"Unsupported number of players: {num_players}")
+        if seed is None:
+            seed = random.getrandbits(64)  # Drawn here so that every game can be replayed from its seed
+        self.seed = seed
+        self.rng = random.Random(seed)  # Every game owns its RNG so runs are reproducible from the seed
         self.hitler_assassinated = False
         self.discarded_policies = []
         self.policy_deck = []
@@ -17,125 +48,333 @@ class SecretHitlerGame:
         self.liberal_policies_enacted = 0
         self.election_tracker = 0
         self.game_ended = False  # Add a game state flag
+        self.rounds_played = 0
+        self.collected_data = []
+        self.recorder = recorder  # Optional TrajectoryRecorder that captures every decision
+        self.log = log if log is not None else EventLog()  # Pass EventLog.SILENT_LOG for headless games
+        self.metrics = metrics  # Optional GameMetrics with counters and phase timers
+        self.player_factory = player_factory  # Called as player_factory(player_id, rng=...) to seat each player
         self.state = GameState(num_players)  # Create an instance of GameState
         self.initialize_game()
 
     def initialize_game(self):
         self.state = GameState(self.num_players)  # Re-initialize GameState
-        roles = ['Liberal'] * 4 + ['Fascist'] * 2 + ['Hitler']
-        random.shuffle(roles)
+        roles = self.deal_roles()
 
         for i in range(self.num_players):
-            player = Player(i)
-            player.role = roles[i]
-            player.is_hitler = (roles[i] == 'Hitler')
-            player.is_alive = True
+            # Players get their own RNG stream, seeded from the game's, so their choices
+            # don't shift the engine's own draws
+            player = self.player_factory(i, rng=random.Random(self.rng.getrandbits(64)))
+            player.reset(roles[i])
+            player.game_state = self.state
             self.players.append(player)
 
-        self.policy_deck = ['Liberal'] * 6 + ['Fascist'] * 11
-        random.shuffle(self.policy_deck)
+        self.policy_deck[:] = POLICY_DECK
+        self.rng.shuffle(self.policy_deck)
+
+    @classmethod
+    def from_state(cls, game_state, roles, policy_deck, discarded_policies, seed=None, player_factory=Player):
+        """
+        A game resumed from game_state at its current decision point. The hidden
+        information game_state doesn't hold (every role, the deck order and the discard
+        pile) is supplied by the caller, e.g. sampled for a search. Nothing is logged,
+        and the players share the game's RNG.
+        """
+        game = cls.__new__(cls)
+        game.seed = seed
+        game.rng = random.Random(seed)
+        game.num_players = game_state.num_players
+        game.state = game_state.clone()
+        game.players = []
+        for i in range(game.num_players):
+            player = player_factory(i, rng=game.rng)
+            player.reset(roles[i])
+            player.is_alive = game.state.is_player_alive(i)
+            player.game_state = game.state
+            game.players.append(player)
+        game.policy_deck = list(policy_deck)
+        game.discarded_policies = list(discarded_policies)
+
+        president_id, chancellor_id = game_state.presidential_candidate, game_state.nominated_chancellor
+        game.president = game.players[president_id] if president_id is not None else None
+        game.chancellor = game.players[chancellor_id] if chancellor_id is not None else None
+        game.hitler_assassinated = False
+        game.liberal_policies_enacted = game_state.enacted_liberal_policies
+        game.fascist_policies_enacted = game_state.enacted_fascist_policies
+        # The state's count of failed elections isn't cleared when the tracker enacts a policy
+        game.election_tracker = game_state.failed_elections_count % 3
+        game.game_ended = False
+        game.rounds_played = len(game_state.government_log) + (1 if game_state.phase <= Phase.VOTE else 0)
+        game.collected_data = []
+        game.recorder = None
+        game.log = SILENT_LOG
+        game.metrics = None
+        game.player_factory = player_factory
+        return game
+
+    def resume(self, player_id, action):
+        """
+        Take action (an ActionSpace tuple) for player_id at the current decision point,
+        finish the round and play on to the end. Meant for games built by from_state;
+        returns the end_game() data.
+        """
+        phase = self.state.phase
+        if phase == Phase.NOMINATION or phase == Phase.VOTE:
+            if phase == Phase.NOMINATION:
+                self.nominate(self.players[action[1]])
+            voters = self.voters()
+            votes = [action[1] if phase == Phase.VOTE and player.player_id == player_id
+                     else player.vote(self.president, self.chancellor) for player in voters]
+            self.count_votes(voters, votes)
+            if self.president and self.chancellor and not self.game_ended:
+                enacted_policy = self.execute_legislative_session()
+                if enacted_policy and not self.game_ended:
+                    self.execute_executive_action(enacted_policy)
+
+        elif phase == Phase.DISCARD or phase == Phase.ENACT:
+            hand = ['Liberal'] * self.state.hand_liberal + ['Fascist'] * self.state.hand_fascist
+            if phase == Phase.DISCARD:
+                hand.remove(action[1])
+                remaining_policies = self.discard_from_hand(action[1], hand)
+                enacted_policy = self.chancellor.enact_policy(remaining_policies)
+            else:
+                remaining_policies = hand
+                # The game has no veto step yet, so a veto enacts at random like Player.enact_policy
+                enacted_policy = action[1] if action[0] == 'Enact' else self.chancellor.enact_policy(remaining_policies)
+            enacted_policy = self.enact_from_hand(enacted_policy, remaining_policies)
+            if not self.game_ended:
+                self.execute_executive_action(enacted_policy)
+
+        elif phase != Phase.GAME_OVER:
+            target = self.players[action[1]]
+            if phase == Phase.INVESTIGATE:
+                self.president.investigated_players.add(target.player_id)
+                self.investigate(target)
+            elif phase == Phase.SPECIAL_ELECTION:
+                self.special_election(target)
+            else:
+                self.execute(target)
+            self.is_game_over()
+
+        return self.start_game()
+
+    def deal_roles(self):
+        return shuffled_roles(self.num_players, self.rng)
+
+    def reset(self, seed=None):
+        """
+        Set up a new game from seed in place, reusing the players, the GameState and
+        the deck lists. The new game plays exactly like SecretHitlerGame(num_players, seed)
+        would. Models, brokers, the recorder, log, metrics and collected_data are kept.
+        """
+        if seed is None:
+            seed = random.getrandbits(64)
+        self.seed = seed
+        self.rng.seed(seed)
+        self.reset_game_state()
+        self.game_ended = False
+        self.state.reset()
+        roles = self.deal_roles()
+        for player, role in zip(self.players, roles):
+            player.reset(role, self.rng.getrandbits(64))
+        self.policy_deck[:] = POLICY_DECK
+        self.rng.shuffle(self.policy_deck)
 
     def reshuffle_policy_deck(self):
         # This should only be called when the policy_deck has fewer than 3 cards
-        print(f"Reshuffling the policy deck with discarded policies: {self.discarded_policies}")  # Debug print
-        if not self.discarded_policies:
-            print("Warning: Attempted to reshuffle with no discarded policies.")
+        if self.log.debug:
+            self.log.event(DEBUG, 'reshuffle', "Reshuffling the policy deck with discarded policies: {discarded_policies}",
+                           discarded_policies=list(self.discarded_policies))
+        if not self.discarded_policies and self.log.warning:
+            self.log.event(WARNING, 'empty_reshuffle', "Warning: Attempted to reshuffle with no discarded policies.")
+        if self.metrics is not None:
+            self.metrics.increment('reshuffles')
         self.policy_deck.extend(self.discarded_policies)
-        random.shuffle(self.policy_deck)
-        self.discarded_policies = []
+        self.rng.shuffle(self.policy_deck)
+        self.discarded_policies.clear()
 
     def start_game(self):
+        if self.metrics is not None:
+            return self.start_instrumented_game()
         while not self.game_ended:  # Check the game state flag instead of self.is_game_over()
             self.conduct_election()
             if self.president and self.chancellor and not self.game_ended:  # Check the flag here too
                 enacted_policy = self.execute_legislative_session()
+                if self.game_ended:
+                    break  # The enacted policy won the game, so no presidential power follows
                 if enacted_policy:
                     self.execute_executive_action(enacted_policy)
+        return self.end_game()
+
+    def start_instrumented_game(self):
+        # The same loop as start_game, with every phase timed by self.metrics
+        metrics = self.metrics
+        profiler = metrics.start_game()
+        try:
+            while not self.game_ended:
+                metrics.run_phase('conduct_election', self.conduct_election)
+                if self.president and self.chancellor and not self.game_ended:
+                    enacted_policy = metrics.run_phase('execute_legislative_session', self.execute_legislative_session)
+                    if self.game_ended:
+                        break
+                    if enacted_policy:
+                        metrics.run_phase('execute_executive_action', self.execute_executive_action, enacted_policy)
+            return self.end_game()
+        finally:
+            metrics.finish_game(self, profiler)
 
     def is_game_over(self):
         if self.liberal_policies_enacted >= 5:
-            print("Liberals win by enacting 5 Liberal Policies!")
+            if self.log.info:
+                self.log.event(INFO, 'win_condition', "Liberals win by enacting 5 Liberal Policies!", condition='liberal_policies')
             self.game_ended = True
             return True
         if self.fascist_policies_enacted >= 6:
-            print("Fascists win by enacting 6 Fascist Policies!")
+            if self.log.info:
+                self.log.event(INFO, 'win_condition', "Fascists win by enacting 6 Fascist Policies!", condition='fascist_policies')
             self.game_ended = True
             return True
         if self.fascist_policies_enacted >= 3 and self.chancellor and self.chancellor.is_hitler:
-            print("Fascists win by electing Hitler as Chancellor!")
+            if self.log.info:
+                self.log.event(INFO, 'win_condition', "Fascists win by electing Hitler as Chancellor!", condition='hitler_elected')
             self.game_ended = True
             return True
         if self.hitler_assassinated:
-            print("Liberals win by assassinating Hitler!")
+            if self.log.info:
+                self.log.event(INFO, 'win_condition', "Liberals win by assassinating Hitler!", condition='hitler_assassinated')
             self.game_ended = True  # Set the game state flag
             return True
         return False
 
     def conduct_election(self):
+        self.start_election()
+
+        # The President nominates a Chancellor among the living players who aren't term-limited
+        self.nominate(self.president.nominate_chancellor(self.chancellor_candidates()))
+
+        # All living players vote
+        voters = self.voters()
+        votes = [player.vote(self.president, self.chancellor) for player in voters]
+        self.count_votes(voters, votes)
+
+    # The phases are split into the steps around each decision, so the async game in
+    # AsyncGameHost can await the decisions and share everything else with this class
+
+    def start_election(self):
         # Nominate the next Presidential candidate
         self.president = self.get_next_presidential_candidate()
+        self.rounds_played += 1
+        if self.metrics is not None:
+            self.metrics.increment('elections')
+        self.state.update_nomination(self.president.player_id)
 
-        # The President nominates a Chancellor. This could be random or based on some strategy.
-        # For simplicity, we're choosing the next player who isn't the President.
-        chancellor_candidates = [p for p in self.players if p != self.president]
-        self.chancellor = random.choice(chancellor_candidates)
+    def nominate(self, chancellor):
+        self.chancellor = chancellor
+        if self.recorder is not None:
+            self.recorder.record_decision(self, self.president, ('Nominate', self.chancellor.player_id))
+        self.state.update_nomination(self.president.player_id, self.chancellor.player_id)
 
-        # All players vote
-        votes = [player.vote(self.president, self.chancellor) for player in self.players]
+    def voters(self):
+        return [player for player in self.players if player.is_alive]
+
+    def count_votes(self, voters, votes):
+        if self.recorder is not None:
+            for player, vote in zip(voters, votes):
+                self.recorder.record_decision(self, player, ('Vote', vote))
 
         # Count the 'Yes' votes
         yes_votes = votes.count('Yes')
+        elected = yes_votes > len(voters) / 2
 
         # Check if the majority is in favor
-        if yes_votes > self.num_players / 2:
+        if elected:
             # Government is elected
-            print(
-                f"Government elected with President {self.president.player_id} and Chancellor {self.chancellor.player_id}")
+            if self.log.info:
+                self.log.event(INFO, 'election', "Government elected with President {president} and Chancellor {chancellor}",
+                               president=self.president.player_id, chancellor=self.chancellor.player_id, elected=True)
             self.election_tracker = 0  # Reset the election tracker
         else:
             # Government is not elected, increment the election tracker
-            print("Government not elected.")
+            if self.log.info:
+                self.log.event(INFO, 'election', "Government not elected.",
+                               president=self.president.player_id, chancellor=self.chancellor.player_id, elected=False)
             self.election_tracker += 1
+            if self.metrics is not None:
+                self.metrics.increment('failed_elections')
 
             # If the election tracker reaches 3, a policy is enacted automatically
             if self.election_tracker == 3:
-                self.enact_policy(self.policy_deck.pop())
+                # The deck can be empty right after a legislative session drew the last three cards
+                if not self.policy_deck:
+                    self.reshuffle_policy_deck()
+                policy = self.policy_deck.pop()
+                self.enact_policy(policy)
+                self.state.update_after_top_deck(policy)
                 self.election_tracker = 0  # Reset the election tracker
 
-        self.state.update_after_election(self.president.player_id, self.chancellor.player_id, yes_votes > self.num_players / 2)
+        self.state.update_after_election(self.president.player_id, self.chancellor.player_id, elected)
+
+    def chancellor_candidates(self):
+        # Mirrors the nomination block of ActionSpace.legal_action_mask
+        candidates = [p for p in self.players if p is not self.president and p.is_alive
+                      and self.state.is_eligible_for_chancellor(p.player_id)]
+        if not candidates:
+            # Nobody is eligible, so the term limits are lifted
+            candidates = [p for p in self.players if p is not self.president and p.is_alive]
+        return candidates
 
     def get_next_presidential_candidate(self):
         # This method should return the next player in line to be the Presidential candidate.
-        # For simplicity, let's just return the next player in the list.
+        # The presidency passes to the next living player in the list.
         current_president_index = self.players.index(self.president) if self.president else -1
         next_president_index = (current_president_index + 1) % self.num_players
+        while not self.players[next_president_index].is_alive:
+            next_president_index = (next_president_index + 1) % self.num_players
         return self.players[next_president_index]
 
     def execute_legislative_session(self):
+        drawn_policies = self.draw_legislative_hand()
+
+        # President discards one policy
+        discarded_policy = self.president.discard_policy(drawn_policies)
+        remaining_policies = self.discard_from_hand(discarded_policy, drawn_policies)
+
+        # Chancellor enacts one of the two remaining policies
+        enacted_policy = self.chancellor.enact_policy(remaining_policies)
+        return self.enact_from_hand(enacted_policy, remaining_policies)
+
+    def draw_legislative_hand(self):
         # Make sure you have enough cards to draw
         if len(self.policy_deck) < 3:
             self.reshuffle_policy_deck()
 
         # Draw three policies
         drawn_policies = [self.policy_deck.pop() for _ in range(3)]
+        self.state.update_legislative_hand(drawn_policies, Phase.DISCARD)
+        return drawn_policies
 
-        # President discards one policy
-        discarded_policy = self.president.discard_policy(drawn_policies)
+    def discard_from_hand(self, discarded_policy, remaining_policies):
+        # remaining_policies is the drawn hand with discarded_policy already taken out
+        if self.recorder is not None:
+            self.recorder.record_decision(self, self.president, ('Discard', discarded_policy))
         self.discarded_policies.append(discarded_policy)
-
-        # Remaining policies for the Chancellor to enact one
-        # After discarding, drawn_policies should have only 2 policies left
-        remaining_policies = drawn_policies
-        print(f"Remaining policies after discarding: {remaining_policies}")  # Debug print
+        if self.log.debug:
+            self.log.event(DEBUG, 'discard', "Remaining policies after discarding: {remaining_policies}",
+                           discarded_policy=discarded_policy, remaining_policies=list(remaining_policies))
 
         if len(remaining_policies) != 2:
             raise Exception(f"Incorrect number of policies for the Chancellor to enact. Expected 2, got {len(remaining_policies)}.")
 
-        # Chancellor enacts one of the two remaining policies
-        enacted_policy = self.chancellor.enact_policy(remaining_policies)
+        self.state.update_legislative_hand(remaining_policies, Phase.ENACT)
+        return remaining_policies
+
+    def enact_from_hand(self, enacted_policy, remaining_policies):
+        if self.recorder is not None:
+            self.recorder.record_decision(self, self.chancellor, ('Enact', enacted_policy))
         remaining_policies.remove(enacted_policy)
         self.discarded_policies.append(remaining_policies[0])
-        print(f"Enacted policy: {enacted_policy}")  # Debug print
+        if self.log.debug:
+            self.log.event(DEBUG, 'enact', "Enacted policy: {policy}", policy=enacted_policy)
 
         self.enact_policy(enacted_policy)
         self.state.update_after_legislation(enacted_policy)
@@ -155,31 +394,64 @@ class SecretHitlerGame:
         if policy != 'Fascist':
             return
 
+        power = self.start_executive_action()
+        if power == Phase.INVESTIGATE:
+            self.investigate(self.president.choose_player_to_investigate(self.players))
+        elif power == Phase.SPECIAL_ELECTION:
+            self.special_election(self.president.pick_next_president(self.players))
+        elif power == Phase.KILL:
+            self.execute(self.president.choose_player_to_kill(self.players))
+
+        # Some actions might end the game, so check if the game is still ongoing
+        self.is_game_over()
+
+    def start_executive_action(self):
+        """
+        Move the state to the presidential power granted by the Fascist policies
+        enacted so far and return its Phase, or None if there is none.
+        """
         # Executive actions based on the number of Fascist policies enacted
         if self.fascist_policies_enacted == 2:
-            player_to_investigate = self.president.choose_player_to_investigate(self.players)
-            result = self.president.investigate_player(player_to_investigate)
-            self.state.update_after_investigation(self.president.player_id, player_to_investigate.player_id, result)
-
+            power = Phase.INVESTIGATE
         elif self.fascist_policies_enacted == 3:
             # For the third Fascist policy, the President picks the next Presidential candidate
-            self.president.pick_next_president(self.players)
-
+            power = Phase.SPECIAL_ELECTION
         elif self.fascist_policies_enacted == 4 or self.fascist_policies_enacted == 5:
             # For the fourth and fifth Fascist policies, the President must kill a player
-            player_to_kill = self.president.choose_player_to_kill(self.players)
-            self.kill_player(player_to_kill)
-            if player_to_kill.is_hitler:
-                self.hitler_assassinated = True  # Game will end
-
-        # Some actions might end the game, so check if the game is still ongoing
-        if self.is_game_over():
-            self.end_game()
+            power = Phase.KILL
+        else:
+            return None
+        if self.metrics is not None:
+            self.metrics.increment('executive_actions')
+        self.state.update_phase(power)
+        return power
+
+    def investigate(self, player_to_investigate):
+        if self.recorder is not None:
+            self.recorder.record_decision(self, self.president, ('Investigate', player_to_investigate.player_id))
+        result = self.president.investigate_player(player_to_investigate)
+        if result is not None and self.log.info:
+            self.log.event(INFO, 'investigation', "Player {investigator} investigates Player {investigated} and discovers they are a {party}.",
+                           investigator=self.president.player_id, investigated=player_to_investigate.player_id, party=result)
+        self.state.update_after_investigation(self.president.player_id, player_to_investigate.player_id, result)
+
+    def special_election(self, next_president):
+        if self.recorder is not None:
+            self.recorder.record_decision(self, self.president, ('SpecialElection', next_president.player_id))
+
+    def execute(self, player_to_kill):
+        if self.recorder is not None:
+            self.recorder.record_decision(self, self.president, ('Kill', player_to_kill.player_id))
+        self.kill_player(player_to_kill)
+        if player_to_kill.is_hitler:
+            self.hitler_assassinated = True  # Game will end
 
     def end_game(self):
         # Log the end state of the game for analysis
         winner = 'Liberals' if self.liberal_policies_enacted >= 5 or self.hitler_assassinated else 'Fascists'
-        print(f"Game over. The {winner} have won.")
+        if self.log.info:
+            self.log.event(INFO, 'game_over', "Game over. The {winner} have won.", winner=winner,
+                           liberal_policies=self.liberal_policies_enacted, fascist_policies=self.fascist_policies_enacted)
 
         # Collect data from the game
         game_data = {
@@ -187,29 +459,48 @@ class SecretHitlerGame:
             'liberal_policies': self.liberal_policies_enacted,
             'fascist_policies': self.fascist_policies_enacted,
             'hitler_assassinated': self.hitler_assassinated,
+            'rounds': self.rounds_played,
+            'num_players': self.num_players,
             # Include other relevant metrics here
         }
         self.collect_data(game_data)
+        self.state.update_after_game_end(winner)
+        if self.recorder is not None:
+            self.recorder.finish_game(self)
 
         # Reset the game state to play again
         self.reset_game_state()
+        return game_data
+
+    def player_view(self, player):
+        """
+        The game's state as seen by player: a copy that also holds player's own role
+        and only the results of player's own investigations. Legal actions come
+        from the game's state, as a view no longer shows who else was investigated.
+        """
+        view = self.state.clone()
+        view.update_roles(player.player_id, player.role)
+        view.hide_investigations(player.investigated_players)
+        view.ai_player_id = player.player_id
+        return view
 
     def collect_data(self, game_data):
         # Append the game data to a list, save to a file, or send to a database
         # This will depend on your data storage strategy
-        pass
+        self.collected_data.append(game_data)
 
     def reset_game_state(self):
         # Reset all the necessary attributes to their initial state
         # You might want to keep some historical data for analysis
         self.hitler_assassinated = False
-        self.discarded_policies = []
-        self.policy_deck = []
+        self.discarded_policies.clear()
+        self.policy_deck.clear()
         self.president = None
         self.chancellor = None
         self.fascist_policies_enacted = 0
         self.liberal_policies_enacted = 0
         self.election_tracker = 0
+        self.rounds_played = 0
         #self.initialize_game()  # Re-initialize the game
 
     def kill_player(self, player):
@@ -0,0 +1,163 @@
+import os
+import random
+
+from EventLog import SILENT_LOG
+from GamePool import GamePool
+from SecretHitlerGame import SecretHitlerGame
+
+# Process pools by worker count, kept alive for every later run in this process
+_worker_pools = {}
+
+# Game pools by player count, reused by every task a worker process runs
+_game_pools = {}
+
+
+def play_game(num_players, seed, recorder=None):
+    """
+    Play a single game to completion and return the data collected by end_game().
+    """
+    game = SecretHitlerGame(num_players, seed=seed, recorder=recorder, log=SILENT_LOG)
+    return game.start_game()
+
+
+def play_games(num_players, seeds, record_path=None):
+    """
+    Play one game per seed. Worker processes receive seeds in chunks so the
+    cost of submitting a task is shared by many games, and a GamePool resets one
+    game in place for each seed instead of building a new one. With record_path,
+    every decision is recorded there as a trajectory dataset. Without it, the
+    GamePool is kept for the next call in the same process.
+    """
+    if record_path is None:
+        pool = _game_pools.get(num_players)
+        if pool is None:
+            pool = _game_pools[num_players] = GamePool(num_players, log=SILENT_LOG)
+        return [pool.play(seed) for seed in seeds]
+    from TrajectoryRecorder import TrajectoryRecorder  # Loads NumPy, so only when recording
+    with TrajectoryRecorder(record_path, num_players) as recorder:
+        pool = GamePool(num_players, recorder=recorder, log=SILENT_LOG)
+        return [pool.play(seed) for seed in seeds]
+
+
+class SimulationResults:
+    def __init__(self, num_players):
+        self.num_players = num_players
+        self.games_played = 0
+        self.wins = {'Liberals': 0, 'Fascists': 0}
+        self.hitler_assassinations = 0
+        self.total_rounds = 0
+        self.min_rounds = None
+        self.max_rounds = None
+        self.total_liberal_policies = 0
+        self.total_fascist_policies = 0
+
+    def add_game(self, game_data):
+        self.games_played += 1
+        self.wins[game_data['winner']] += 1
+        if game_data['hitler_assassinated']:
+            self.hitler_assassinations += 1
+        rounds = game_data['rounds']
+        self.total_rounds += rounds
+        self.min_rounds = rounds if self.min_rounds is None else min(self.min_rounds, rounds)
+        self.max_rounds = rounds if self.max_rounds is None else max(self.max_rounds, rounds)
+        self.total_liberal_policies += game_data['liberal_policies']
+        self.total_fascist_policies += game_data['fascist_policies']
+
+    def win_rate(self, team):
+        return self.wins[team] / self.games_played if self.games_played else 0.0
+
+    def mean_rounds(self):
+        return self.total_rounds / self.games_played if self.games_played else 0.0
+
+    def as_dict(self):
+        games = self.games_played or 1
+        return {
+            'num_players': self.num_players,
+            'games_played': self.games_played,
+            'liberal_win_rate': self.win_rate('Liberals'),
+            'fascist_win_rate': self.win_rate('Fascists'),
+            'hitler_assassinations': self.hitler_assassinations,
+            'mean_rounds': self.mean_rounds(),
+            'min_rounds': self.min_rounds,
+            'max_rounds': self.max_rounds,
+            'mean_liberal_policies': self.total_liberal_policies / games,
+            'mean_fascist_policies': self.total_fascist_policies / games,
+        }
+
+    def summary(self):
+        return (f"{self.games_played} games with {self.num_players} players: "
+                f"Liberals won {self.win_rate('Liberals'):.1%}, Fascists won {self.win_rate('Fascists'):.1%} "
+                f"({self.hitler_assassinations} by assassinating Hitler). "
+                f"Rounds per game: mean {self.mean_rounds():.2f}, min {self.min_rounds}, max {self.max_rounds}.")
+
+
+def _worker_ready():
+    return os.getpid()
+
+
+def worker_pool(workers):
+    """
+    A ProcessPoolExecutor with workers processes, shared by every run in this
+    process. Its workers are all started the first time it is asked for and then
+    reused, so later runs don't pay for starting processes and importing the game
+    in each of them. Call shutdown_worker_pools() to stop them early; otherwise
+    they are stopped when the interpreter exits.
+    """
+    executor = _worker_pools.get(workers)
+    if executor is None:
+        from concurrent.futures import ProcessPoolExecutor
+        executor = _worker_pools[workers] = ProcessPoolExecutor(max_workers=workers)
+        # Every task submitted while no worker is idle starts a new one
+        for future in [executor.submit(_worker_ready) for _ in range(workers)]:
+            future.result()
+    return executor
+
+
+def shutdown_worker_pools():
+    for executor in _worker_pools.values():
+        executor.shutdown()
+    _worker_pools.clear()
+
+
+def game_seeds(num_games, seed=None):
+    """
+    Derive one seed per game from a master seed. The seeds depend only on the
+    master seed, never on how games are spread across workers.
+    """
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(num_games)]
+
+
+def run_simulations(num_games, num_players=7, seed=None, workers=None, chunk_size=None, record_path=None):
+    """
+    Play num_games independent games across a pool of worker processes.
+
+    :param num_games: Number of games to play
+    :param num_players: Number of players in every game
+    :param seed: Master seed; the same seed always produces the same results
+    :param workers: Number of worker processes (defaults to the CPU count, 1 runs in-process)
+    :param chunk_size: Games per task sent to a worker (defaults to an even split into a few tasks per worker)
+    :param record_path: Directory to record trajectories to, one part_* subdirectory per task
+    :return: SimulationResults aggregated over all games
+    """
+    seeds = game_seeds(num_games, seed)
+    workers = workers or os.cpu_count() or 1
+    results = SimulationResults(num_players)
+
+    if workers == 1:
+        part_path = os.path.join(record_path, 'part_00000') if record_path else None
+        for game_data in play_games(num_players, seeds, part_path):
+            results.add_game(game_data)
+        return results
+
+    if chunk_size is None:
+        # A few tasks per worker keeps them all busy without paying per-game IPC
+        chunk_size = max(1, num_games // (workers * 4))
+    chunks = [seeds[i:i + chunk_size] for i in range(0, num_games, chunk_size)]
+    part_paths = [os.path.join(record_path, f"part_{i:05d}") if record_path else None for i in range(len(chunks))]
+
+    executor = worker_pool(workers)
+    for chunk_data in executor.map(play_games, [num_players] * len(chunks), chunks, part_paths):
+        for game_data in chunk_data:
+            results.add_game(game_data)
+    return results
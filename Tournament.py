@@ -0,0 +1,291 @@
+import argparse
+import math
+import random
+from collections import deque
+
+from EventLog import SILENT_LOG
+from Player import Player
+from SecretHitlerGame import SecretHitlerGame, shuffled_roles
+from SimulationRunner import worker_pool
+
+ROLES = ('Liberal', 'Fascist', 'Hitler')
+
+
+def random_agent(player_id, rng=None):
+    return Player(player_id, rng=rng)
+
+
+def mcts_agent(player_id, rng=None):
+    from MCTSPlayer import MCTSPlayer  # Loads NumPy, so only when an MCTS agent plays
+    return MCTSPlayer(player_id, rng=rng, time_budget=None, iterations=50)
+
+
+# Agents the command line can enter by name
+AGENTS = {
+    'random': random_agent,
+    'mcts': mcts_agent,
+}
+
+
+def wilson_interval(wins, games, z=1.96):
+    """
+    Wilson score interval (low, high) for a win rate of wins out of games; z is
+    the normal quantile of the confidence level (1.96 for 95%).
+    """
+    if games == 0:
+        return 0.0, 1.0
+    rate = wins / games
+    denominator = 1 + z * z / games
+    centre = (rate + z * z / (2 * games)) / denominator
+    half_width = z * math.sqrt(rate * (1 - rate) / games + z * z / (4 * games * games)) / denominator
+    return centre - half_width, centre + half_width
+
+
+class EloRatings:
+    """
+    An Elo rating per (agent, role), so that playing Hitler well and playing a
+    Liberal well are rated separately. Each game is a match between the Liberal
+    team and the Fascist team (Hitler included), each rated at the mean rating of
+    its seats in their roles; every (agent, role) in the game then moves once by
+    k_factor times its team's score minus its expected score, however many seats
+    it filled. The game's built-in bias towards one team ends up in the gap
+    between the role ratings.
+    """
+
+    def __init__(self, k_factor=8.0, initial_rating=1500.0):
+        self.k_factor = k_factor
+        self.initial_rating = initial_rating
+        self.ratings = {}
+
+    def rating(self, agent, role):
+        return self.ratings.get((agent, role), self.initial_rating)
+
+    def update(self, seats, roles, winner):
+        """
+        Rate one game: seats[i] is the agent in seat i, roles[i] its role and winner
+        'Liberals' or 'Fascists'. Returns the Liberals' expected score before the game.
+        """
+        liberal = [self.rating(agent, role) for agent, role in zip(seats, roles) if role == 'Liberal']
+        fascist = [self.rating(agent, role) for agent, role in zip(seats, roles) if role != 'Liberal']
+        expected = 1 / (1 + 10 ** ((sum(fascist) / len(fascist) - sum(liberal) / len(liberal)) / 400))
+        change = self.k_factor * ((1.0 if winner == 'Liberals' else 0.0) - expected)
+        for agent, role in set(zip(seats, roles)):
+            self.ratings[agent, role] = self.rating(agent, role) + (change if role == 'Liberal' else -change)
+        return expected
+
+
+class SeatFactory:
+    """
+    player_factory that seats agents[seats[i]] in seat i. Picklable as long as
+    the agent factories are, e.g. module-level functions or functools.partial
+    of a Player class.
+    """
+
+    def __init__(self, agents, seats):
+        self.agents = agents
+        self.seats = seats
+
+    def __call__(self, player_id, rng):
+        return self.agents[self.seats[player_id]](player_id, rng=rng)
+
+
+def play_matches(num_players, agents, matches):
+    """
+    Play each (seed, seats) match and return the winners, in order. Runs in the
+    worker processes.
+    """
+    winners = []
+    for seed, seats in matches:
+        game = SecretHitlerGame(num_players, seed=seed, log=SILENT_LOG, player_factory=SeatFactory(agents, seats))
+        winners.append(game.start_game()['winner'])
+        for player in game.players:
+            close = getattr(player, 'close', None)
+            if close is not None:
+                close()
+    return winners
+
+
+class Tournament:
+    """
+    Evaluates agents against each other in mixed-seat games and rates them per
+    role, until the win rates are known precisely enough.
+
+    agents maps names to player factories, called like SecretHitlerGame's
+    player_factory: factory(player_id, rng=rng) -> Player. Every game seats up to
+    num_players of the focus agents (default: all), those with the fewest games
+    first, and fills the other seats from opponents (default: all agents). Each
+    seated agent takes the role it has played least among the roles the game's
+    seed deals, so agents play every role as evenly as the dealt roles allow.
+
+    Games run in worker processes in chunks of chunk_size. Results are rated in
+    the order the games were scheduled, so a tournament is reproducible from its
+    seed whatever the number of workers. run() stops once every focus agent's win
+    rate in every role is within precision at the confidence of z, or after
+    max_games.
+
+        tournament = Tournament({'random': random_agent, 'candidate': partial(Player, model=model)},
+                                focus=['candidate'], seed=0, workers=4)
+        tournament.run(max_games=5000, precision=0.05)
+        print(tournament.format_standings())
+    """
+
+    def __init__(self, agents, num_players=7, focus=None, opponents=None, seed=None, workers=1, chunk_size=4,
+                 k_factor=8.0, z=1.96):
+        self.agents = agents
+        self.num_players = num_players
+        self.focus = list(focus) if focus is not None else list(agents)
+        self.opponents = list(opponents) if opponents is not None else list(agents)
+        self.rng = random.Random(seed)
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.z = z
+        self.elo = EloRatings(k_factor)
+        self.assigned = {agent: dict.fromkeys(ROLES, 0) for agent in agents}  # Seats scheduled per role
+        self.games = {agent: dict.fromkeys(ROLES, 0) for agent in agents}  # Seats played per role
+        self.wins = {agent: dict.fromkeys(ROLES, 0) for agent in agents}
+        self.games_played = 0
+
+    def schedule_match(self):
+        """
+        The seed and seating (agent name per seat) of the next game.
+        """
+        seed = self.rng.getrandbits(64)
+        roles = shuffled_roles(self.num_players, random.Random(seed))
+        open_seats = {role: [seat for seat, seat_role in enumerate(roles) if seat_role == role] for role in ROLES}
+
+        focus = sorted(self.focus, key=lambda agent: (sum(self.assigned[agent].values()), self.rng.random()))
+        seated = focus[:self.num_players]
+        seated += [self.rng.choice(self.opponents) for _ in range(self.num_players - len(seated))]
+        seats = [None] * self.num_players
+        for agent in seated:
+            counts = self.assigned[agent]
+            role = min((role for role in ROLES if open_seats[role]), key=lambda role: (counts[role], self.rng.random()))
+            seats[open_seats[role].pop()] = agent
+            counts[role] += 1
+        return seed, seats
+
+    def record(self, match, winner):
+        """
+        Rate one finished game.
+        """
+        seed, seats = match
+        roles = shuffled_roles(self.num_players, random.Random(seed))
+        self.elo.update(seats, roles, winner)
+        for agent, role in zip(seats, roles):
+            self.games[agent][role] += 1
+            if (winner == 'Liberals') == (role == 'Liberal'):
+                self.wins[agent][role] += 1
+        self.games_played += 1
+
+    def win_rate_interval(self, agent, role):
+        return wilson_interval(self.wins[agent][role], self.games[agent][role], self.z)
+
+    def converged(self, precision, min_games=30):
+        """
+        Whether every focus agent has played every role at least min_games times,
+        with a win-rate interval no wider than +-precision.
+        """
+        for agent in self.focus:
+            for role in ROLES:
+                if self.games[agent][role] < min_games:
+                    return False
+                low, high = self.win_rate_interval(agent, role)
+                if (high - low) / 2 > precision:
+                    return False
+        return True
+
+    def run(self, max_games, precision=0.05, min_games=30, callback=None):
+        """
+        Play games until converged(precision, min_games) or max_games, and return
+        standings(). callback(tournament, match, winner) is called after each game
+        is rated, to stream the ratings as they change.
+        """
+        stopped = False
+
+        def rate(matches, winners):
+            nonlocal stopped
+            for match, winner in zip(matches, winners):
+                if stopped:
+                    return  # Games scheduled before the stop are not rated
+                self.record(match, winner)
+                if callback is not None:
+                    callback(self, match, winner)
+                stopped = self.games_played >= max_games or self.converged(precision, min_games)
+
+        scheduled = 0
+
+        def next_chunk():
+            nonlocal scheduled
+            size = min(self.chunk_size, max_games - scheduled)
+            scheduled += size
+            return [self.schedule_match() for _ in range(size)]
+
+        if self.workers <= 1:
+            while not stopped and scheduled < max_games:
+                matches = next_chunk()
+                rate(matches, play_matches(self.num_players, self.agents, matches))
+            return self.standings()
+
+        # Keep a few chunks per worker in flight, rating them in the order they were scheduled
+        executor = worker_pool(self.workers)
+        pending = deque()
+        while not stopped and (pending or scheduled < max_games):
+            while scheduled < max_games and len(pending) < 2 * self.workers:
+                matches = next_chunk()
+                pending.append((matches, executor.submit(play_matches, self.num_players, self.agents, matches)))
+            matches, future = pending.popleft()
+            rate(matches, future.result())
+        for _, future in pending:
+            future.cancel()
+        return self.standings()
+
+    def standings(self):
+        """
+        Per agent and role: games, wins, win rate, its interval and Elo rating.
+        """
+        return {agent: {role: {
+            'games': self.games[agent][role],
+            'wins': self.wins[agent][role],
+            'win_rate': self.wins[agent][role] / self.games[agent][role] if self.games[agent][role] else None,
+            'interval': self.win_rate_interval(agent, role),
+            'elo': self.elo.rating(agent, role),
+        } for role in ROLES} for agent in self.agents}
+
+    def format_standings(self):
+        lines = [f"{self.games_played} games with {self.num_players} players"]
+        for agent, roles in self.standings().items():
+            cells = []
+            for role, result in roles.items():
+                if result['games']:
+                    low, high = result['interval']
+                    cells.append(f"{role} {result['elo']:6.0f} Elo, won {result['win_rate']:.1%} "
+                                 f"[{low:.1%}, {high:.1%}] of {result['games']}")
+            lines.append(f"  {agent:<10} " + '; '.join(cells))
+        return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rate agents per role in mixed-seat Secret Hitler games.")
+    parser.add_argument('--agents', nargs='+', choices=list(AGENTS), default=list(AGENTS), help="agents in the pool")
+    parser.add_argument('--focus', nargs='+', choices=list(AGENTS), default=None, help="agents to evaluate (default: all)")
+    parser.add_argument('--players', type=int, default=7, help="number of players per game")
+    parser.add_argument('--games', type=int, default=5000, help="most games to play")
+    parser.add_argument('--precision', type=float, default=0.05, help="stop once every win rate is known to within this")
+    parser.add_argument('--min-games', type=int, default=30, help="fewest games per agent and role before stopping")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the schedule")
+    parser.add_argument('--workers', type=int, default=1, help="worker processes")
+    parser.add_argument('--report-every', type=int, default=0, metavar='N', help="print the standings every N games")
+    args = parser.parse_args(argv)
+
+    def report(tournament, match, winner):
+        if tournament.games_played % args.report_every == 0:
+            print(tournament.format_standings(), flush=True)
+
+    tournament = Tournament({name: AGENTS[name] for name in args.agents}, args.players, focus=args.focus,
+                            seed=args.seed, workers=args.workers)
+    tournament.run(args.games, args.precision, args.min_games, callback=report if args.report_every else None)
+    print(tournament.format_standings())
+
+
+if __name__ == "__main__":
+    main()
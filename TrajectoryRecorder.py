@@ -0,0 +1,220 @@
+import glob
+import json
+import os
+import queue
+import threading
+
+import numpy as np
+
+from ActionSpace import action_space_for
+from FeatureEncoder import encoder_for
+from GameState import GameState, Role, role_code
+
+METADATA_FILE = 'metadata.json'
+
+
+def trajectory_columns(num_players):
+    """
+    Column name -> (dtype, per-step shape) for one trajectory step.
+    """
+    return {
+        'game_id': (np.int64, ()),  # Numbered per recorder, so unique within one part_* directory
+        'player_id': (np.int8, ()),
+        'role': (np.int8, ()),  # GameState.Role code of the acting player
+        'features': (np.float32, (encoder_for(num_players).feature_length,)),
+        'legal_mask': (np.bool_, (len(action_space_for(num_players)),)),
+        'action': (np.int16, ()),  # Index into ActionSpace
+        'reward': (np.float32, ()),
+        'done': (np.bool_, ()),  # Last step of this player in this game
+        'won': (np.bool_, ()),  # On done steps, whether the player's team won the game
+    }
+
+
+class PendingStep:
+    """
+    A player's latest decision, kept until the player's next decision (or the end
+    of the game) decides its reward.
+    """
+
+    def __init__(self, num_players):
+        self.features = encoder_for(num_players).new_buffer()
+        self.legal_mask = np.zeros(len(action_space_for(num_players)), dtype=np.bool_)
+        self.action = None
+        self.previous_state = None
+
+
+class TrajectoryRecorder:
+    """
+    Records every decision made in the games it is attached to and streams the
+    steps to disk as shards of .npy columns, ready to be memory-mapped by
+    TrajectoryDataset.
+
+    Steps are collected in preallocated chunks of chunk_size rows. A full chunk is
+    handed to a background thread that writes it out, so recording never waits on
+    the disk. Call close() to write the last partial chunk and stop the thread.
+    """
+
+    def __init__(self, path, num_players, chunk_size=4096):
+        self.path = path
+        self.num_players = num_players
+        self.chunk_size = chunk_size
+        self.columns = trajectory_columns(num_players)
+        self.action_space = action_space_for(num_players)
+        self.encoder = encoder_for(num_players)
+        self.next_game_id = 0
+        self.games = {}  # id(game) -> (game_id, list of PendingStep per player)
+        self.steps_recorded = 0
+        self.shards_written = 0
+
+        os.makedirs(path, exist_ok=True)
+        with open(os.path.join(path, METADATA_FILE), 'w') as f:
+            json.dump({
+                'num_players': num_players,
+                'feature_length': self.encoder.feature_length,
+                'num_actions': len(self.action_space),
+                'columns': list(self.columns),
+            }, f)
+
+        self.free_chunks = queue.Queue()
+        self.full_chunks = queue.Queue()
+        self.chunk = self.new_chunk()
+        self.chunk_rows = 0
+        self.writer = threading.Thread(target=self._write_chunks, name="TrajectoryRecorder", daemon=True)
+        self.writer.start()
+
+    def new_chunk(self):
+        return {name: np.zeros((self.chunk_size,) + shape, dtype=dtype)
+                for name, (dtype, shape) in self.columns.items()}
+
+    def record(self, game_id, player_id, role, features, legal_mask, action, reward, done, won=False):
+        """
+        Append one step. features and legal_mask are copied into the current chunk.
+        """
+        row = self.chunk_rows
+        chunk = self.chunk
+        chunk['game_id'][row] = game_id
+        chunk['player_id'][row] = player_id
+        chunk['role'][row] = role
+        chunk['features'][row] = features
+        chunk['legal_mask'][row] = legal_mask
+        chunk['action'][row] = action
+        chunk['reward'][row] = reward
+        chunk['done'][row] = done
+        chunk['won'][row] = won
+        self.chunk_rows += 1
+        self.steps_recorded += 1
+        if self.chunk_rows == self.chunk_size:
+            self._hand_off_chunk()
+
+    def record_decision(self, game, player, action):
+        """
+        Called by SecretHitlerGame whenever a player decides, while game.state is
+        still in the phase of that decision. The step stays pending until the
+        player's next decision, when its reward is known.
+        """
+        game_entry = self.games.get(id(game))
+        if game_entry is None:
+            game_entry = self.games[id(game)] = (self.next_game_id, [PendingStep(self.num_players) for _ in range(self.num_players)])
+            self.next_game_id += 1
+        step = game_entry[1][player.player_id]
+        if step.action is not None:
+            self._close_step(game, game_entry[0], player, step, done=False)
+
+        view = game.player_view(player)
+        self.encoder.encode(view, player.role, step.features)
+        self.action_space.legal_action_mask(game.state, player.player_id, step.legal_mask)
+        step.action = action
+        step.previous_state = view
+
+    def finish_game(self, game):
+        """
+        Called by SecretHitlerGame once the game is over: every player's last step
+        gets its terminal reward and is marked done.
+        """
+        game_entry = self.games.pop(id(game), None)
+        if game_entry is None:
+            return
+        game_id, steps = game_entry
+        for player in game.players:
+            step = steps[player.player_id]
+            if step.action is not None:
+                self._close_step(game, game_id, player, step, done=True)
+
+    def _close_step(self, game, game_id, player, step, done):
+        current_state = game.player_view(player)
+        action = self.action_space.action_index(step.action)
+        reward = GameState.calculate_reward(step.previous_state, current_state, step.action, True,
+                                            legal=bool(step.legal_mask[action]))
+        role = role_code(player.role)
+        won = done and (current_state.winner == 'Fascists') == (role >= Role.FASCIST)
+        self.record(game_id, player.player_id, role, step.features, step.legal_mask, action, reward, done, won)
+        step.action = None
+        step.previous_state = None
+
+    def _hand_off_chunk(self):
+        self.full_chunks.put((self.chunk, self.chunk_rows))
+        try:
+            self.chunk = self.free_chunks.get_nowait()
+        except queue.Empty:
+            # The writer is behind; grow the pool rather than wait for it
+            self.chunk = self.new_chunk()
+        self.chunk_rows = 0
+
+    def _write_chunks(self):
+        while True:
+            item = self.full_chunks.get()
+            if item is None:
+                return
+            chunk, rows = item
+            shard_path = os.path.join(self.path, f"shard_{self.shards_written:06d}")
+            os.makedirs(shard_path, exist_ok=True)
+            for name, column in chunk.items():
+                np.save(os.path.join(shard_path, name + '.npy'), column[:rows])
+            self.shards_written += 1
+            self.free_chunks.put(chunk)
+
+    def close(self):
+        if self.chunk_rows:
+            self._hand_off_chunk()
+        self.full_chunks.put(None)
+        self.writer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class TrajectoryDataset:
+    """
+    Read-only view over everything recorded under path (including the part_*
+    directories written by run_simulations). Columns are memory-mapped, so nothing
+    is read from disk until it is used.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.shards = []
+        self.shard_parts = []  # Index of the directory each shard was recorded in, as game ids restart per directory
+        directories = {}
+        for shard_path in sorted(glob.glob(os.path.join(path, '**', 'shard_*'), recursive=True)):
+            self.shard_parts.append(directories.setdefault(os.path.dirname(shard_path), len(directories)))
+            columns = {}
+            for column_path in glob.glob(os.path.join(shard_path, '*.npy')):
+                name = os.path.splitext(os.path.basename(column_path))[0]
+                columns[name] = np.load(column_path, mmap_mode='r')
+            self.shards.append(columns)
+
+    def __len__(self):
+        return sum(len(shard['action']) for shard in self.shards)
+
+    def iter_batches(self, batch_size, columns=None):
+        """
+        Yield dicts of column name -> memory-mapped slice of at most batch_size steps.
+        Batches never span shards, so no data is copied.
+        """
+        for shard in self.shards:
+            names = columns or list(shard)
+            for start in range(0, len(shard['action']), batch_size):
+                yield {name: shard[name][start:start + batch_size] for name in names}
@@ -0,0 +1,241 @@
+import numpy as np
+
+from SecretHitlerGame import ROLE_DISTRIBUTION
+from SimulationRunner import SimulationResults
+
+# Integer codes used in the role and deck arrays
+LIBERAL = 0
+FASCIST = 1
+HITLER = 2
+
+TOTAL_LIBERAL_POLICIES = 6
+TOTAL_FASCIST_POLICIES = 11
+DECK_SIZE = TOTAL_LIBERAL_POLICIES + TOTAL_FASCIST_POLICIES
+
+
+class VectorizedSecretHitlerGame:
+    """
+    Plays num_games games of Secret Hitler in lockstep. Every piece of game state
+    is a NumPy array with one row per game, and each phase method advances all
+    unfinished games at once.
+
+    The rules and the random players mirror SecretHitlerGame move for move, so
+    both engines produce the same distribution of outcomes.
+    """
+
+    def __init__(self, num_games, num_players=7, seed=None):
+        if num_players not in ROLE_DISTRIBUTION:
+            raise ValueError(f"Unsupported number of players: {num_players}")
+        self.num_games = num_games
+        self.num_players = num_players
+        self.rng = np.random.default_rng(seed)
+        self.rows = np.arange(num_games)
+        self.initialize_games()
+
+    def initialize_games(self):
+        num_games, num_players = self.num_games, self.num_players
+        num_liberals, num_fascists = ROLE_DISTRIBUTION[num_players]
+
+        # Shuffle each game's roles and deck by sorting random keys along the rows
+        roles = np.array([LIBERAL] * num_liberals + [FASCIST] * num_fascists + [HITLER], dtype=np.int8)
+        self.roles = roles[self.rng.random((num_games, num_players)).argsort(axis=1)]
+        deck = np.array([LIBERAL] * TOTAL_LIBERAL_POLICIES + [FASCIST] * TOTAL_FASCIST_POLICIES, dtype=np.int8)
+        self.policy_deck = deck[self.rng.random((num_games, DECK_SIZE)).argsort(axis=1)]
+        # The top of the deck is the last card, as with list.pop() in the scalar engine
+        self.deck_size = np.full(num_games, DECK_SIZE, dtype=np.int8)
+        self.discarded_liberal = np.zeros(num_games, dtype=np.int8)
+        self.discarded_fascist = np.zeros(num_games, dtype=np.int8)
+
+        self.alive = np.ones((num_games, num_players), dtype=bool)
+        self.eligible = np.ones((num_games, num_players), dtype=bool)
+        self.investigated = np.zeros((num_games, num_players), dtype=bool)
+        self.president = np.full(num_games, -1, dtype=np.int8)
+        self.chancellor = np.full(num_games, -1, dtype=np.int8)
+        self.elected = np.zeros(num_games, dtype=bool)
+        self.liberal_policies_enacted = np.zeros(num_games, dtype=np.int8)
+        self.fascist_policies_enacted = np.zeros(num_games, dtype=np.int8)
+        self.election_tracker = np.zeros(num_games, dtype=np.int8)
+        self.hitler_assassinated = np.zeros(num_games, dtype=bool)
+        self.game_ended = np.zeros(num_games, dtype=bool)
+        self.rounds_played = np.zeros(num_games, dtype=np.int16)
+        # Policy enacted by this round's legislative session, -1 when there was none
+        self.enacted_policy = np.full(num_games, -1, dtype=np.int8)
+
+    def reshuffle_policy_decks(self, rows):
+        """
+        Shuffle the discard piles of the given games back into their decks.
+        """
+        if rows.size == 0:
+            return
+        size = self.deck_size[rows].astype(np.int64)[:, None]
+        liberal_end = size + self.discarded_liberal[rows][:, None]
+        total = liberal_end + self.discarded_fascist[rows][:, None]
+        positions = np.arange(DECK_SIZE)[None, :]
+
+        # Lay out the remaining deck followed by the discards, then shuffle the used prefix
+        decks = np.where(positions < liberal_end, LIBERAL, FASCIST).astype(np.int8)
+        decks = np.where(positions < size, self.policy_deck[rows], decks)
+        keys = self.rng.random((rows.size, DECK_SIZE))
+        keys[positions >= total] = 2.0  # Unused slots sort to the end
+        self.policy_deck[rows] = np.take_along_axis(decks, keys.argsort(axis=1), axis=1)
+
+        self.deck_size[rows] = total[:, 0]
+        self.discarded_liberal[rows] = 0
+        self.discarded_fascist[rows] = 0
+
+    def draw_policies(self, rows, count):
+        """
+        Pop count policies off the top of each given game's deck. Returns a
+        (len(rows), count) array in draw order.
+        """
+        offsets = self.deck_size[rows].astype(np.int64)[:, None] - 1 - np.arange(count)[None, :]
+        drawn = np.take_along_axis(self.policy_deck[rows], offsets, axis=1)
+        self.deck_size[rows] -= count
+        return drawn
+
+    def enact_policies(self, rows, policies):
+        self.liberal_policies_enacted[rows] += policies == LIBERAL
+        self.fascist_policies_enacted[rows] += policies == FASCIST
+        self.check_game_over(rows)
+
+    def check_game_over(self, rows):
+        chancellor_is_hitler = self.roles[rows, self.chancellor[rows]] == HITLER
+        self.game_ended[rows] |= ((self.liberal_policies_enacted[rows] >= 5)
+                                  | (self.fascist_policies_enacted[rows] >= 6)
+                                  | ((self.fascist_policies_enacted[rows] >= 3) & chancellor_is_hitler)
+                                  | self.hitler_assassinated[rows])
+
+    def conduct_elections(self):
+        rows = self.rows[~self.game_ended]
+        num_players = self.num_players
+        alive = self.alive[rows]
+        index = np.arange(rows.size)
+
+        # The presidency passes to the next living player
+        following = (self.president[rows, None] + 1 + np.arange(num_players)[None, :]) % num_players
+        president = following[index, alive[index[:, None], following].argmax(axis=1)]
+        self.president[rows] = president
+        self.rounds_played[rows] += 1
+
+        # The President nominates a random living player who isn't term-limited
+        candidates = alive & self.eligible[rows]
+        candidates[index, president] = False
+        no_candidates = ~candidates.any(axis=1)
+        candidates[no_candidates] = alive[no_candidates]
+        candidates[index, president] = False
+        chancellor = self.random_choice(candidates)
+        self.chancellor[rows] = chancellor
+
+        # Every living player votes Yes with probability 1/2
+        voters = alive.sum(axis=1)
+        yes_votes = self.rng.binomial(voters, 0.5)
+        elected = yes_votes > voters / 2
+        self.elected[rows] = elected
+
+        # The elected government is term-limited; with five or fewer players alive
+        # only the Chancellor is
+        elected_rows = rows[elected]
+        self.eligible[elected_rows] = True
+        self.eligible[elected_rows, chancellor[elected]] = False
+        limit_president = voters[elected] > 5
+        self.eligible[elected_rows[limit_president], president[elected][limit_president]] = False
+        self.election_tracker[rows] = np.where(elected, 0, self.election_tracker[rows] + 1)
+
+        # Three failed elections in a row enact the top policy of the deck
+        chaos = rows[self.election_tracker[rows] == 3]
+        self.reshuffle_policy_decks(chaos[self.deck_size[chaos] == 0])
+        self.election_tracker[chaos] = 0
+        self.enact_policies(chaos, self.draw_policies(chaos, 1)[:, 0])
+
+    def execute_legislative_sessions(self):
+        self.enacted_policy[:] = -1
+        rows = self.rows[~self.game_ended]
+        self.reshuffle_policy_decks(rows[self.deck_size[rows] < 3])
+        drawn = self.draw_policies(rows, 3)
+
+        # The President discards one card at random and the Chancellor enacts one of
+        # the other two at random, so the enacted card is uniform over the three drawn
+        choice = self.rng.integers(0, 3, size=rows.size)
+        enacted = drawn[np.arange(rows.size), choice]
+        drawn_liberal = (drawn == LIBERAL).sum(axis=1, dtype=np.int8)
+        enacted_liberal = (enacted == LIBERAL).astype(np.int8)
+        self.discarded_liberal[rows] += drawn_liberal - enacted_liberal
+        self.discarded_fascist[rows] += (3 - drawn_liberal) - (1 - enacted_liberal)
+
+        self.enacted_policy[rows] = enacted
+        self.enact_policies(rows, enacted)
+
+    def execute_executive_actions(self):
+        # Like the scalar engine, the President acts on every Fascist policy enacted
+        # in the legislative session, unless that policy just ended the game
+        fascist_rows = self.rows[(self.enacted_policy == FASCIST) & ~self.game_ended]
+        fascist_count = self.fascist_policies_enacted[fascist_rows]
+
+        investigating = fascist_rows[fascist_count == 2]
+        if investigating.size:
+            candidates = self.alive[investigating] & ~self.investigated[investigating]
+            candidates[np.arange(investigating.size), self.president[investigating]] = False
+            targets = self.random_choice(candidates)
+            has_target = targets >= 0
+            self.investigated[investigating[has_target], targets[has_target]] = True
+
+        # The President kills a random living player other than themselves
+        killing = fascist_rows[(fascist_count == 4) | (fascist_count == 5)]
+        candidates = self.alive[killing]
+        candidates[np.arange(killing.size), self.president[killing]] = False
+        targets = self.random_choice(candidates)
+        self.alive[killing, targets] = False
+        self.hitler_assassinated[killing] |= self.roles[killing, targets] == HITLER
+
+        self.check_game_over(fascist_rows)
+
+    def random_choice(self, candidates):
+        """
+        Pick a uniformly random True column in each row of a boolean matrix,
+        returning -1 for rows without any.
+        """
+        keys = np.where(candidates, self.rng.random(candidates.shape), -1.0)
+        choice = keys.argmax(axis=1)
+        return np.where(candidates.any(axis=1), choice, -1)
+
+    def step(self):
+        """
+        Play one round (election, legislative session, executive action) of every
+        unfinished game.
+        """
+        self.conduct_elections()
+        self.execute_legislative_sessions()
+        self.execute_executive_actions()
+
+    def start_games(self):
+        while not self.game_ended.all():
+            self.step()
+        return self.results()
+
+    def winners(self):
+        """
+        Per-game winner: True where the Liberals won.
+        """
+        return (self.liberal_policies_enacted >= 5) | self.hitler_assassinated
+
+    def results(self):
+        """
+        Aggregate the finished games into the same SimulationResults the scalar
+        runner produces.
+        """
+        finished = self.game_ended
+        liberal_wins = self.winners()[finished]
+        rounds = self.rounds_played[finished]
+
+        results = SimulationResults(self.num_players)
+        results.games_played = int(finished.sum())
+        results.wins['Liberals'] = int(liberal_wins.sum())
+        results.wins['Fascists'] = results.games_played - results.wins['Liberals']
+        results.hitler_assassinations = int(self.hitler_assassinated[finished].sum())
+        if rounds.size:
+            results.total_rounds = int(rounds.sum())
+            results.min_rounds = int(rounds.min())
+            results.max_rounds = int(rounds.max())
+        results.total_liberal_policies = int(self.liberal_policies_enacted[finished].sum())
+        results.total_fascist_policies = int(self.fascist_policies_enacted[finished].sum())
+        return results
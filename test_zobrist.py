@@ -0,0 +1,10 @@
+import pytest
+
+from HashCheck import verify_incremental_hash
+
+
+@pytest.mark.parametrize('num_players', [5, 7, 10])
+def test_incremental_hash_matches_full_recomputation(num_players):
+    checks, mismatches = verify_incremental_hash(num_games=200, num_players=num_players, seed=num_players)
+    assert checks > 0
+    assert mismatches == []